@@ -1,4 +1,5 @@
 from pathlib import Path
+from tempfile import TemporaryDirectory
 import csv
 import random
 
@@ -8,6 +9,7 @@ import shinyswatch
 
 from dp_wizard.utils.argparse_helpers import get_cli_info, CLIInfo
 from dp_wizard.utils.csv_helper import read_csv_names
+from dp_wizard.utils.workers import worker_pool
 from dp_wizard.app import (
     about_panel,
     analysis_panel,
@@ -122,10 +124,31 @@ def _clip(n: float, lower_bound: float, upper_bound: float) -> float:
 
 
 def make_server_from_cli_info(cli_info: CLIInfo):
+    # Unlike session workspaces, Parquet copies are shared by all sessions.
+    # The directory is removed when the TemporaryDirectory is finalized at exit.
+    parquet_cache = (
+        TemporaryDirectory(prefix="dp-wizard-parquet-", ignore_cleanup_errors=True)
+        if cli_info.cache_parquet
+        else None
+    )
+    parquet_cache_dir = Path(parquet_cache.name) if parquet_cache else None
+
     def server(input: Inputs, output: Outputs, session: Session):  # pragma: no cover
+        # Files written for this session go in its own workspace,
+        # so concurrent sessions don't overwrite each other's files.
+        workspace = TemporaryDirectory(
+            prefix="dp-wizard-session-", ignore_cleanup_errors=True
+        )
+        session.on_ended(workspace.cleanup)
+        workspace_path = Path(workspace.name)
+        # Slow work runs in the shared pools, with a limit for each session.
+        workers = worker_pool.session()
+        # So operators can see if the pools are keeping up:
+        session.on_ended(worker_pool.log_metrics)
+
         if cli_info.is_demo:
             initial_contributions = 10
-            initial_private_csv_path = Path(__file__).parent.parent / "tmp" / "demo.csv"
+            initial_private_csv_path = workspace_path / "demo.csv"
             _make_demo_csv(initial_private_csv_path, initial_contributions)
             initial_column_names = read_csv_names(Path(initial_private_csv_path))
         else:
@@ -138,10 +161,14 @@ def make_server_from_cli_info(cli_info: CLIInfo):
         column_names = reactive.value(initial_column_names)
 
         public_csv_path = reactive.value("")
+        public_profile = reactive.value({})
         analysis_types = reactive.value({})
         lower_bounds = reactive.value({})
         upper_bounds = reactive.value({})
         bin_counts = reactive.value({})
+        alphas = reactive.value({})
+        candidate_counts = reactive.value({})
+        candidate_spacings = reactive.value({})
         groups = reactive.value([])
         weights = reactive.value({})
         epsilon = reactive.value(1.0)
@@ -161,40 +188,54 @@ def make_server_from_cli_info(cli_info: CLIInfo):
             initial_private_csv_path=str(initial_private_csv_path),
             public_csv_path=public_csv_path,
             private_csv_path=private_csv_path,
+            public_profile=public_profile,
             column_names=column_names,
             contributions=contributions,
+            workers=workers,
         )
         analysis_panel.analysis_server(
             input,
             output,
             session,
             is_demo=cli_info.is_demo,
+            parquet_cache_dir=parquet_cache_dir,
             public_csv_path=public_csv_path,
+            public_profile=public_profile,
             column_names=column_names,
             contributions=contributions,
             analysis_types=analysis_types,
             lower_bounds=lower_bounds,
             upper_bounds=upper_bounds,
             bin_counts=bin_counts,
+            alphas=alphas,
+            candidate_counts=candidate_counts,
+            candidate_spacings=candidate_spacings,
             groups=groups,
             weights=weights,
             epsilon=epsilon,
+            workers=workers,
         )
         results_panel.results_server(
             input,
             output,
             session,
             no_uploads=cli_info.no_uploads,
+            workspace=workspace_path,
             public_csv_path=public_csv_path,
             private_csv_path=private_csv_path,
+            public_profile=public_profile,
             contributions=contributions,
             analysis_types=analysis_types,
             lower_bounds=lower_bounds,
             upper_bounds=upper_bounds,
             bin_counts=bin_counts,
+            alphas=alphas,
+            candidate_counts=candidate_counts,
+            candidate_spacings=candidate_spacings,
             groups=groups,
             weights=weights,
             epsilon=epsilon,
+            workers=workers,
         )
         feedback_panel.feedback_server(
             input,
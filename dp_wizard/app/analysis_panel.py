@@ -1,26 +1,44 @@
+import asyncio
 from math import pow
-from typing import Iterable, Any
+from typing import Iterable, Any, Optional
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
+import polars as pl
 
 
 from htmltools import tags
 from shiny import ui, reactive, render, Inputs, Outputs, Session
 
 from dp_wizard.app.components.inputs import log_slider
-from dp_wizard.app.components.column_module import column_ui, column_server
+from dp_wizard.app.components.column_module import (
+    column_ui,
+    column_server,
+    default_analysis_type,
+)
+from dp_wizard.utils.code_generators.analyses import histogram
 from dp_wizard.utils.csv_helper import (
     id_names_dict_from_names,
     id_labels_dict_from_names,
+    get_csv_fingerprint,
     get_csv_row_count,
+    get_data_sample,
+    get_parquet_copy,
+    ColumnProfile,
 )
+from dp_wizard.utils.mock_data import mock_lazy_frame, ColumnDef
 from dp_wizard.app.components.outputs import (
     output_code_sample,
     demo_tooltip,
     nav_button,
 )
 from dp_wizard.utils.code_generators import make_privacy_loss_block
+from dp_wizard.utils.dp_helper import AccuracyHistogramCache, HistogramSpec
+from dp_wizard.utils.workers import SessionWorkers
+
+
+# Long enough to wait for the next keystroke when typing a bound.
+_preview_delay_seconds = 0.3
 
 
 def analysis_ui():
@@ -128,10 +146,20 @@ def analysis_server(
     lower_bounds: reactive.Value[dict[str, float]],
     upper_bounds: reactive.Value[dict[str, float]],
     bin_counts: reactive.Value[dict[str, int]],
+    alphas: reactive.Value[dict[str, tuple[float, ...]]],
+    candidate_counts: reactive.Value[dict[str, int]],
+    candidate_spacings: reactive.Value[dict[str, str]],
     groups: reactive.Value[list[str]],
     weights: reactive.Value[dict[str, str]],
     epsilon: reactive.Value[float],
+    public_profile: reactive.Value[dict[str, ColumnProfile]],
+    workers: SessionWorkers,
+    parquet_cache_dir: Optional[Path] = None,
 ):  # pragma: no cover
+    # Previews for all the histograms are released together,
+    # so flipping back to earlier settings reuses the earlier release.
+    accuracy_histogram_cache = AccuracyHistogramCache()
+
     @reactive.calc
     def button_enabled():
         column_ids_selected = input.columns_selectize()
@@ -141,14 +169,34 @@ def analysis_server(
     def _update_columns():
         csv_ids_labels = csv_ids_labels_calc()
         ui.update_selectize(
-            "groups_selectize",
+            "columns_selectize",
             label=None,
             choices=csv_ids_labels,
         )
+
+    @reactive.effect
+    def _update_groups():
+        # If we have a profile of public data, only offer columns
+        # with few enough distinct values to be useful for grouping.
+        profile = public_profile()
+        column_ids_to_names = csv_ids_names_calc()
+        group_ids_labels = {
+            column_id: label
+            for column_id, label in csv_ids_labels_calc().items()
+            if (column_profile := profile.get(column_ids_to_names[column_id])) is None
+            or column_profile.is_group_eligible()
+        }
+        with reactive.isolate():
+            selected = [
+                group_id
+                for group_id in input.groups_selectize()
+                if group_id in group_ids_labels
+            ]
         ui.update_selectize(
-            "columns_selectize",
+            "groups_selectize",
             label=None,
-            choices=csv_ids_labels,
+            choices=group_ids_labels,
+            selected=selected,
         )
 
     @reactive.effect
@@ -178,10 +226,30 @@ def analysis_server(
             """,
         )
 
+    @reactive.extended_task
+    async def public_row_count_task(csv_path: str) -> int:
+        # Counting rows reads the whole file, so run it in a worker thread,
+        # and report progress back on the event loop.
+        loop = asyncio.get_running_loop()
+        with ui.Progress() as progress:
+            progress.set(message="Counting rows in public CSV...")
+
+            def on_progress(fraction: float):
+                loop.call_soon_threadsafe(progress.set, fraction)
+
+            return await workers.run(
+                get_csv_row_count, Path(csv_path), on_progress=on_progress
+            )
+
+    @reactive.effect
+    def _count_public_rows():
+        if public_csv_path():
+            public_row_count_task(public_csv_path())
+
     @render.ui
     def simulation_card_ui():
         if public_csv_path():
-            row_count = get_csv_row_count(Path(public_csv_path()))
+            row_count = str(public_row_count_task.result())
             return [
                 ui.markdown(
                     f"""
@@ -223,6 +291,105 @@ def analysis_server(
                 ),
             ]
 
+    @reactive.calc
+    def histogram_specs_calc() -> dict[str, HistogramSpec]:
+        # As in the results, weights().keys() reflects the selected columns.
+        weights_sum = sum(float(weight) for weight in weights().values())
+        specs = {}
+        for name, weight in weights().items():
+            if analysis_types().get(name, default_analysis_type) != histogram.name:
+                continue
+            lower_bound = lower_bounds().get(name)
+            upper_bound = upper_bounds().get(name)
+            bin_count = bin_counts().get(name)
+            if (
+                lower_bound is None
+                or upper_bound is None
+                or bin_count is None
+                or not lower_bound < upper_bound
+                or bin_count < 1
+            ):
+                # The card explains the error, and the other previews go ahead.
+                continue
+            specs[name] = HistogramSpec(
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                bin_count=bin_count,
+                weighted_epsilon=epsilon() * float(weight) / weights_sum,
+            )
+        return specs
+
+    @reactive.extended_task
+    async def histogram_previews_task(
+        csv_path: str,
+        histograms: dict[str, HistogramSpec],
+        row_count: int,
+        contributions: int,
+    ) -> dict[str, pl.DataFrame]:
+        # Every new invocation cancels the last, so while inputs are changing
+        # quickly, the task is cancelled here, before any work has started.
+        await asyncio.sleep(_preview_delay_seconds)
+        if csv_path:
+            data_fingerprint = get_csv_fingerprint(Path(csv_path))
+
+            def get_sample():
+                path = Path(csv_path)
+                if parquet_cache_dir is not None:
+                    # Converted the first time, and then reused by other previews.
+                    path = get_parquet_copy(path, parquet_cache_dir)
+                return get_data_sample(path)
+
+            # Only the first preview after an upload actually reads the file.
+            sample = await workers.run(get_sample)
+            make_lf = sample.df.lazy
+            # The context only sees the sample, so that bounds the partitions,
+            # and the exact counts are scaled to the estimated rows selected,
+            # which default to the size of the whole file.
+            sample_row_count = sample.df.height
+            count_scale = row_count / max(sample_row_count, 1)
+        else:
+            # Mock data only depends on the bounds, which are part of the key.
+            data_fingerprint = "mock"
+
+            def make_lf():
+                return mock_lazy_frame(
+                    {
+                        name: ColumnDef(spec.lower_bound, spec.upper_bound)
+                        for name, spec in histograms.items()
+                    },
+                    row_count=row_count,
+                )
+
+            sample_row_count = row_count
+            count_scale = 1
+
+        # The release scans the data, so run it in a worker thread.
+        results = await workers.run(
+            accuracy_histogram_cache.get,
+            data_fingerprint=data_fingerprint,
+            make_lf=make_lf,
+            histograms=histograms,
+            row_count=sample_row_count,
+            contributions=contributions,
+            count_scale=count_scale,
+        )
+        return {name: preview for name, (_accuracy, preview) in results.items()}
+
+    @reactive.effect
+    def _start_histogram_previews():
+        histograms = histogram_specs_calc()
+        if not histograms:
+            return
+        # Anything in progress or queued is for stale inputs,
+        # so cancel it, and its result will never be shown.
+        histogram_previews_task.cancel()
+        histogram_previews_task(
+            public_csv_path(),
+            histograms,
+            int(input.row_count()),
+            contributions(),
+        )
+
     @render.ui
     def columns_ui():
         column_ids = input.columns_selectize()
@@ -232,17 +399,21 @@ def analysis_server(
                 column_id,
                 public_csv_path=public_csv_path(),
                 name=column_ids_to_names[column_id],
+                profile=public_profile().get(column_ids_to_names[column_id]),
                 contributions=contributions(),
                 epsilon=epsilon(),
                 # saved_epsilon=saved_epsilon,
-                row_count=int(input.row_count()),
                 analysis_types=analysis_types,
                 lower_bounds=lower_bounds,
                 upper_bounds=upper_bounds,
                 bin_counts=bin_counts,
+                alphas=alphas,
+                candidate_counts=candidate_counts,
+                candidate_spacings=candidate_spacings,
                 weights=weights,
                 is_demo=is_demo,
                 is_single_column=len(column_ids) == 1,
+                histogram_previews_task=histogram_previews_task,
             )
         return [column_ui(column_id) for column_id in column_ids]
 
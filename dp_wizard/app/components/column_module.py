@@ -1,4 +1,5 @@
 from logging import info
+from typing import Optional
 
 from htmltools.tags import details, summary
 from shiny import ui, render, module, reactive, Inputs, Outputs, Session
@@ -13,9 +14,14 @@ from dp_wizard.utils.code_generators.analyses import (
     quantile,
     stdeviation,
 )
-from dp_wizard.utils.dp_helper import make_accuracy_histogram
-from dp_wizard.utils.shared import plot_bars
-from dp_wizard.utils.code_generators import make_column_config_block
+from dp_wizard.utils.dp_helper import make_histogram_accuracy
+from dp_wizard.utils.shared import make_candidates, plot_bars
+from dp_wizard.utils.code_generators import (
+    make_column_config_block,
+    default_alphas,
+    default_candidate_count,
+    default_candidate_spacing,
+)
 from dp_wizard.app.components.outputs import (
     output_code_sample,
     demo_tooltip,
@@ -23,7 +29,7 @@ from dp_wizard.app.components.outputs import (
     hide_if,
 )
 from dp_wizard.utils.dp_helper import confidence
-from dp_wizard.utils.mock_data import mock_data, ColumnDef
+from dp_wizard.utils.csv_helper import ColumnProfile
 
 
 default_analysis_type = histogram.name
@@ -86,6 +92,67 @@ def get_bound_error(lower_bound, upper_bound):
     return "\n".join(f"- {m}" for m in messages)
 
 
+def parse_alphas(alphas_str: str) -> tuple[float, ...]:
+    """
+    Parse a comma-separated list of quantiles, which may be percentages.
+    Duplicates are dropped, and the rest are sorted.
+    >>> parse_alphas("0.9, 25%,0.5, 0.25")
+    (0.25, 0.5, 0.9)
+    >>> parse_alphas("")
+    ()
+    """
+    alphas = set()
+    for alpha_str in alphas_str.split(","):
+        alpha_str = alpha_str.strip()
+        if not alpha_str:
+            continue
+        if alpha_str.endswith("%"):
+            alphas.add(round(float(alpha_str[:-1]) / 100, 6))
+        else:
+            alphas.add(float(alpha_str))
+    return tuple(sorted(alphas))
+
+
+def get_alphas_error(alphas_str):
+    """
+    >>> get_alphas_error("0.25, 0.5, 0.75")
+    ''
+    >>> get_alphas_error("")
+    '- At least one quantile is required.'
+    >>> get_alphas_error("half")
+    '- Quantiles should be numbers, separated by commas.'
+    >>> get_alphas_error("0.5, 1.5")
+    '- Quantiles should be between 0 and 1.'
+    """
+    messages = []
+    try:
+        alphas = parse_alphas(alphas_str or "")
+    except ValueError:
+        messages.append("Quantiles should be numbers, separated by commas.")
+    else:
+        if not alphas:
+            messages.append("At least one quantile is required.")
+        elif not all(0 <= alpha <= 1 for alpha in alphas):
+            messages.append("Quantiles should be between 0 and 1.")
+    return "\n".join(f"- {m}" for m in messages)
+
+
+def get_candidate_count_error(candidate_count):
+    """
+    >>> get_candidate_count_error(101)
+    ''
+    >>> get_candidate_count_error(None)
+    '- Candidate count is required.'
+    >>> get_candidate_count_error(1)
+    '- Candidate count should be at least 2.'
+    """
+    if candidate_count is None:
+        return "- Candidate count is required."
+    if candidate_count < 2:
+        return "- Candidate count should be at least 2."
+    return ""
+
+
 def error_md_ui(markdown):  # pragma: no cover
     return info_md_box(markdown)
 
@@ -124,14 +191,18 @@ def column_server(
     name: str,
     contributions: int,
     epsilon: float,
-    row_count: int,
     analysis_types: reactive.Value[dict[str, str]],
     lower_bounds: reactive.Value[dict[str, float]],
     upper_bounds: reactive.Value[dict[str, float]],
     bin_counts: reactive.Value[dict[str, int]],
+    alphas: reactive.Value[dict[str, tuple[float, ...]]],
+    candidate_counts: reactive.Value[dict[str, int]],
+    candidate_spacings: reactive.Value[dict[str, str]],
     weights: reactive.Value[dict[str, str]],
     is_demo: bool,
     is_single_column: bool,
+    histogram_previews_task: reactive.ExtendedTask[..., dict[str, pl.DataFrame]],
+    profile: Optional[ColumnProfile] = None,
 ):  # pragma: no cover
 
     @reactive.effect
@@ -172,16 +243,35 @@ def column_server(
             raise SilentException()
         bin_counts.set({**bin_counts(), name: value})
 
+    @reactive.effect
+    @reactive.event(input.alphas)
+    def _set_alphas():
+        if get_alphas_error(input.alphas()):
+            raise SilentException()
+        alphas.set({**alphas(), name: parse_alphas(input.alphas())})
+
+    @reactive.effect
+    @reactive.event(input.candidates)
+    def _set_candidates():
+        value = input.candidates()
+        if get_candidate_count_error(value):
+            raise SilentException()
+        candidate_counts.set({**candidate_counts(), name: int(value)})
+
+    @reactive.effect
+    @reactive.event(input.candidate_spacing)
+    def _set_candidate_spacing():
+        candidate_spacings.set(
+            {**candidate_spacings(), name: input.candidate_spacing()}
+        )
+
     @reactive.effect
     @reactive.event(input.weight)
     def _set_weight():
         weights.set({**weights(), name: input.weight()})
 
-    @reactive.calc()
-    def accuracy_histogram():
-        lower_x = float(input.lower_bound())
-        upper_x = float(input.upper_bound())
-        bin_count = int(input.bins())
+    @reactive.calc
+    def weighted_epsilon_calc():
         weight = float(input.weight())
         weights_sum = sum(float(weight) for weight in weights().values())
         info(f"Weight ratio for {name}: {weight}/{weights_sum}")
@@ -189,27 +279,38 @@ def column_server(
             # This function is triggered when column is removed;
             # Exit early to avoid divide-by-zero.
             raise SilentException("weights_sum == 0")
+        return epsilon * weight / weights_sum
 
-        # Mock data only depends on lower and upper bounds, so it could be cached,
-        # but I'd guess this is dominated by the DP operations,
-        # so not worth optimizing.
-        # TODO: Use real public data, if we have it!
-        if public_csv_path:
-            lf = pl.scan_csv(public_csv_path)
-        else:
-            lf = pl.LazyFrame(
-                mock_data({name: ColumnDef(lower_x, upper_x)}, row_count=row_count)
-            )
-        return make_accuracy_histogram(
-            lf=lf,
-            column_name=name,
-            row_count=row_count,
-            lower_bound=lower_x,
-            upper_bound=upper_x,
-            bin_count=bin_count,
+    @reactive.calc
+    def accuracy_calc():
+        # Accuracy only depends on the privacy parameters,
+        # so it is available immediately, before the preview release.
+        return make_histogram_accuracy(
             contributions=contributions,
-            weighted_epsilon=epsilon * weight / weights_sum,
+            weighted_epsilon=weighted_epsilon_calc(),
+        ).accuracy
+
+    @reactive.calc
+    def histogram_preview_calc() -> pl.DataFrame:
+        # Released by the panel together with the other histograms.
+        # If this column is missing, its inputs have an error,
+        # or they haven't been saved yet.
+        histogram = histogram_previews_task.result().get(name)
+        if histogram is None:
+            raise SilentException()
+        return histogram
+
+    @reactive.calc
+    def candidate_args_calc():
+        # The preview and the generated code make the same candidates.
+        spacing = candidate_spacings().get(name, default_candidate_spacing)
+        public_quantiles = (
+            profile.get_quantile_pairs()
+            if profile is not None and spacing == "public"
+            else ()
         )
+        count = candidate_counts().get(name, default_candidate_count)
+        return count, spacing, public_quantiles
 
     @render.text
     def card_header():
@@ -239,8 +340,10 @@ def column_server(
             case median.name:
                 return ui.markdown(
                     """
-                    In DP Wizard the median is picked from evenly spaced
-                    candidates, but the OpenDP library is more flexible.
+                    The median is picked from candidates between the bounds:
+                    They can be evenly spaced, closer together at the
+                    lower bound for skewed data, or, if there is public data,
+                    closer together where its values are.
                     Because the median isn't based on the addition of noise,
                     we can't estimate the error as we do with the other
                     statistics.
@@ -257,14 +360,20 @@ def column_server(
             case quantile.name:
                 return ui.markdown(
                     """
-                    Compute the quantile value of data.
+                    Quantiles are picked from candidates between the bounds,
+                    spaced as for the median.
+                    All the quantiles for a column are released together,
+                    and share its part of the privacy budget,
+                    so asking for fewer makes each more accurate.
+                    More candidates give finer answers, but take longer.
                     """
                 )
             case stdeviation.name:
                 return ui.markdown(
                     """
-                    Compute standard deviation value of data by manually computing mean
-                    and count.
+                    The standard deviation is derived from a sum,
+                    a sum of squares, and a count, which are released together,
+                    so it only uses this column's share of the budget.
                     """
                 )
             case _:
@@ -280,11 +389,15 @@ def column_server(
             "lg": [2, 10],
         }
 
+        # If there is public data, suggest its range as the bounds.
+        default_bounds = profile.get_default_bounds() if profile is not None else None
+        default_lower, default_upper = default_bounds or (0, 10)
+
         def lower_bound_input():
             return ui.input_text(
                 "lower_bound",
                 ["Lower Bound", ui.output_ui("bounds_tooltip_ui")],
-                str(lower_bounds().get(name, 0)),
+                str(lower_bounds().get(name, default_lower)),
                 width=label_width,
             )
 
@@ -292,7 +405,7 @@ def column_server(
             return ui.input_text(
                 "upper_bound",
                 "Upper Bound",
-                str(upper_bounds().get(name, 10)),
+                str(upper_bounds().get(name, default_upper)),
                 width=label_width,
             )
 
@@ -304,6 +417,35 @@ def column_server(
                 width=label_width,
             )
 
+        def alphas_input():
+            return ui.input_text(
+                "alphas",
+                "Quantiles",
+                ", ".join(str(alpha) for alpha in alphas().get(name, default_alphas)),
+                width=label_width,
+            )
+
+        def candidate_count_input():
+            return ui.input_numeric(
+                "candidates",
+                "Candidates",
+                candidate_counts().get(name, default_candidate_count),
+                min=2,
+                width=label_width,
+            )
+
+        def candidate_spacing_input():
+            spacings = {"linear": "Even", "log": "Log scale"}
+            if profile is not None and profile.quantiles:
+                spacings["public"] = "Public data"
+            return ui.input_select(
+                "candidate_spacing",
+                "Spacing",
+                spacings,
+                selected=candidate_spacings().get(name, default_candidate_spacing),
+                width=label_width,
+            )
+
         match input.analysis_type():
             case histogram.name:
                 with reactive.isolate():
@@ -336,6 +478,8 @@ def column_server(
                         [
                             lower_bound_input(),
                             upper_bound_input(),
+                            candidate_count_input(),
+                            candidate_spacing_input(),
                             ui.output_ui("optional_weight_ui"),
                             # ui.output_text("privacy_cost_text"),
                         ],
@@ -360,6 +504,9 @@ def column_server(
                         [
                             lower_bound_input(),
                             upper_bound_input(),
+                            alphas_input(),
+                            candidate_count_input(),
+                            candidate_spacing_input(),
                             ui.output_ui("optional_weight_ui"),
                             # ui.output_text("privacy_cost_text"),
                         ],
@@ -440,20 +587,37 @@ def column_server(
 
     @render.code
     def column_code():
+        candidate_count, candidate_spacing, public_quantiles = candidate_args_calc()
         return make_column_config_block(
             name=name,
             analysis_type=input.analysis_type(),
             lower_bound=float(input.lower_bound()),
             upper_bound=float(input.upper_bound()),
-            bin_count=int(input.bins()),
+            bin_count=int(bin_counts().get(name, 10)),
+            alphas=alphas().get(name, default_alphas),
+            candidate_count=candidate_count,
+            candidate_spacing=candidate_spacing,
+            public_quantiles=public_quantiles,
+        )
+
+    @render.ui
+    def candidates_ui():
+        candidates = make_candidates(
+            float(input.lower_bound()),
+            float(input.upper_bound()),
+            *candidate_args_calc(),
         )
+        shown = [f"{c:g}" for c in candidates]
+        if len(shown) > 8:
+            shown = [*shown[:4], "…", *shown[-3:]]
+        return ui.markdown(f"{len(candidates)} candidates: {', '.join(shown)}")
 
     @render.ui
     def histogram_preview_ui():
         if error_md := error_md_calc():
             return error_md_ui(error_md)
         else:
-            accuracy, histogram = accuracy_histogram()
+            accuracy = accuracy_calc()
             return [
                 ui.output_plot("histogram_preview_plot", height="300px"),
                 ui.layout_columns(
@@ -486,6 +650,16 @@ def column_server(
 
     @render.ui
     def median_preview_ui():
+        error_md = "\n".join(
+            error
+            for error in [
+                error_md_calc(),
+                get_candidate_count_error(input.candidates()),
+            ]
+            if error
+        )
+        if error_md:
+            return error_md_ui(error_md)
         return [
             ui.p(
                 """
@@ -493,6 +667,7 @@ def column_server(
                 there is not a preview visualization.
                 """
             ),
+            ui.output_ui("candidates_ui"),
             output_code_sample("Column Definition", "column_code"),
         ]
 
@@ -514,17 +689,26 @@ def column_server(
 
     @render.ui
     def quantile_preview_ui():
-        # accuracy, histogram = accuracy_histogram()
-        if error_md := error_md_calc():
+        error_md = "\n".join(
+            error
+            for error in [
+                error_md_calc(),
+                get_alphas_error(input.alphas()),
+                get_candidate_count_error(input.candidates()),
+            ]
+            if error
+        )
+        if error_md:
             return error_md_ui(error_md)
         else:
             return [
                 ui.p(
                     """
-                    Since the quantile is just a single number,
+                    Since each quantile is just a single number,
                     there is not a preview visualization.
                     """
                 ),
+                ui.output_ui("candidates_ui"),
                 output_code_sample("Column Definition", "column_code"),
             ]
 
@@ -545,12 +729,12 @@ def column_server(
 
     @render.data_frame
     def data_frame():
-        accuracy, histogram = accuracy_histogram()
-        return render.DataGrid(histogram)
+        return render.DataGrid(histogram_preview_calc())
 
     @render.plot
     def histogram_preview_plot():
-        accuracy, histogram = accuracy_histogram()
+        accuracy = accuracy_calc()
+        histogram = histogram_preview_calc()
         s = "s" if contributions > 1 else ""
         title = ", ".join(
             [
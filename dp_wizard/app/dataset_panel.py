@@ -1,3 +1,4 @@
+from logging import warning
 from pathlib import Path
 from typing import Optional
 
@@ -8,7 +9,11 @@ from dp_wizard.utils.argparse_helpers import (
     PRIVATE_TEXT,
     PUBLIC_PRIVATE_TEXT,
 )
-from dp_wizard.utils.csv_helper import get_csv_names_mismatch
+from dp_wizard.utils.csv_helper import (
+    ColumnProfile,
+    get_csv_names_mismatch,
+    get_data_profile,
+)
 from dp_wizard.app.components.outputs import (
     output_code_sample,
     demo_tooltip,
@@ -17,7 +22,8 @@ from dp_wizard.app.components.outputs import (
     nav_button,
 )
 from dp_wizard.utils.code_generators import make_privacy_unit_block
-from dp_wizard.utils.csv_helper import read_csv_names
+from dp_wizard.utils.csv_helper import read_csv_names, data_extensions
+from dp_wizard.utils.workers import SessionWorkers
 
 
 dataset_panel_id = "dataset_panel"
@@ -55,22 +61,47 @@ def dataset_server(
     initial_private_csv_path: str,
     public_csv_path: reactive.Value[str],
     private_csv_path: reactive.Value[str],
+    public_profile: reactive.Value[dict[str, ColumnProfile]],
     column_names: reactive.Value[list[str]],
     contributions: reactive.Value[int],
+    workers: SessionWorkers,
 ):  # pragma: no cover
     @reactive.effect
     @reactive.event(input.public_csv_path)
-    def _on_public_csv_path_change():
+    async def _on_public_csv_path_change():
         path = input.public_csv_path()[0]["datapath"]
         public_csv_path.set(path)
-        column_names.set(read_csv_names(Path(path)))
+        column_names.set(await workers.run(read_csv_names, Path(path)))
+        public_profile.set({})
+        public_profile_task(path)
+
+    @reactive.extended_task
+    async def public_profile_task(path: str) -> dict[str, ColumnProfile]:
+        # Profiling reads the whole file, so run it in a worker thread.
+        # The profile is cached, so later previews don't need to scan again.
+        return await workers.run(get_data_profile, Path(path))
+
+    @reactive.effect
+    def _set_public_profile():
+        # The profile only improves the defaults, so a failure isn't fatal:
+        # An exception here would close the session.
+        if public_profile_task.status() == "error":
+            warning(f"Public CSV profile failed: {public_profile_task.error.get()}")
+            ui.notification_show(
+                "The public CSV could not be profiled, "
+                "so the usual defaults will be suggested.",
+                type="warning",
+            )
+            public_profile.set({})
+            return
+        public_profile.set(public_profile_task.result())
 
     @reactive.effect
     @reactive.event(input.private_csv_path)
-    def _on_private_csv_path_change():
+    async def _on_private_csv_path_change():
         path = input.private_csv_path()[0]["datapath"]
         private_csv_path.set(path)
-        column_names.set(read_csv_names(Path(path)))
+        column_names.set(await workers.run(read_csv_names, Path(path)))
 
     @reactive.effect
     @reactive.event(input.column_names)
@@ -143,7 +174,7 @@ Choose both **Public CSV** and **Private CSV** {PUBLIC_PRIVATE_TEXT}"""
             ui.input_file(
                 "public_csv_path",
                 "Choose Public CSV",
-                accept=[".csv"],
+                accept=data_extensions,
                 placeholder=Path(initial_public_csv_path).name,
             ),
             ui.input_file(
@@ -156,7 +187,7 @@ Choose both **Public CSV** and **Private CSV** {PUBLIC_PRIVATE_TEXT}"""
                         "on assignments for a class.",
                     ),
                 ],
-                accept=[".csv"],
+                accept=data_extensions,
                 placeholder=Path(initial_private_csv_path).name,
             ),
         )
@@ -1,4 +1,5 @@
 from pathlib import Path
+import asyncio
 import re
 
 from shiny import ui, render, reactive, Inputs, Outputs, Session, types
@@ -8,9 +9,15 @@ from htmltools.tags import p
 from dp_wizard.utils.code_generators import (
     AnalysisPlan,
     AnalysisPlanColumn,
+    default_alphas,
+    default_candidate_count,
+    default_candidate_spacing,
 )
 from dp_wizard.utils.code_generators.notebook_generator import NotebookGenerator
 from dp_wizard.utils.code_generators.script_generator import ScriptGenerator
+from dp_wizard.utils.artifacts import notebook_artifacts_cache
+from dp_wizard.utils.csv_helper import ColumnProfile, estimate_max_num_partitions
+from dp_wizard.utils.workers import SessionWorkers
 from dp_wizard.utils.converters import (
     convert_py_to_nb,
     convert_nb_to_html,
@@ -32,11 +39,11 @@ def button(name: str, ext: str, icon: str, primary=False):  # pragma: no cover
     )
 
 
-def make_download_or_modal_error(download_generator):  # pragma: no cover
+async def make_download_or_modal_error(download_generator):  # pragma: no cover
     try:
         with ui.Progress() as progress:
             progress.set(message=wait_message)
-            return download_generator()
+            return await download_generator()
     except Exception as e:
         modal = ui.modal(
             ui.pre(str(e)),
@@ -62,16 +69,22 @@ def results_server(
     output: Outputs,
     session: Session,
     no_uploads: bool,
+    workspace: Path,
     public_csv_path: reactive.Value[str],
     private_csv_path: reactive.Value[str],
+    public_profile: reactive.Value[dict[str, ColumnProfile]],
     contributions: reactive.Value[int],
     analysis_types: reactive.Value[dict[str, str]],
     lower_bounds: reactive.Value[dict[str, float]],
     upper_bounds: reactive.Value[dict[str, float]],
     bin_counts: reactive.Value[dict[str, int]],
+    alphas: reactive.Value[dict[str, tuple[float, ...]]],
+    candidate_counts: reactive.Value[dict[str, int]],
+    candidate_spacings: reactive.Value[dict[str, str]],
     groups: reactive.Value[list[str]],
     weights: reactive.Value[dict[str, str]],
     epsilon: reactive.Value[float],
+    workers: SessionWorkers,
 ):  # pragma: no cover
     @render.ui
     def download_results_ui():
@@ -174,6 +187,14 @@ def results_server(
 
     @reactive.calc
     def analysis_plan() -> AnalysisPlan:
+        def get_public_quantiles(col):
+            # Only in the plan when they are used, so the plan key
+            # doesn't depend on public data the code doesn't read.
+            profile = public_profile().get(col)
+            if profile is None or candidate_spacings().get(col) != "public":
+                return ()
+            return profile.get_quantile_pairs()
+
         # weights().keys() will reflect the desired columns:
         # The others retain inactive columns, so user
         # inputs aren't lost when toggling checkboxes.
@@ -184,6 +205,12 @@ def results_server(
                 upper_bound=upper_bounds()[col],
                 bin_count=int(bin_counts()[col]),
                 weight=int(weights()[col]),
+                alphas=alphas().get(col, default_alphas),
+                candidate_count=candidate_counts().get(col, default_candidate_count),
+                candidate_spacing=candidate_spacings().get(
+                    col, default_candidate_spacing
+                ),
+                public_quantiles=get_public_quantiles(col),
             )
             for col in weights().keys()
         }
@@ -196,44 +223,74 @@ def results_server(
             epsilon=epsilon(),
             groups=groups(),
             columns=columns,
+            max_num_partitions=(
+                estimate_max_num_partitions(public_profile(), groups())
+                if groups()
+                else None
+            ),
         )
 
     @reactive.calc
-    def notebook_nb():
+    async def notebook_artifacts():
         # This creates the notebook, and evaluates it,
-        # and drops reports in the tmp dir.
+        # and then renders HTML and PDF in the background.
         # Could be slow!
-        # Luckily, reactive calcs are lazy.
-        notebook_py = NotebookGenerator(analysis_plan()).make_py()
-        return convert_py_to_nb(notebook_py, execute=True)
+        # Luckily, reactive calcs are lazy,
+        # and the results are shared by sessions with the same plan.
+        return await workers.run_artifact(
+            notebook_artifacts_cache.get, analysis_plan(), workspace=workspace
+        )
 
     @reactive.calc
-    def notebook_nb_unexecuted():
-        notebook_py = NotebookGenerator(analysis_plan()).make_py()
-        return convert_py_to_nb(notebook_py, execute=False)
+    async def notebook_nb():
+        return (await notebook_artifacts()).notebook
+
+    @reactive.calc
+    async def notebook_nb_unexecuted():
+        notebook_py = NotebookGenerator(analysis_plan(), report_dir=workspace).make_py()
+        return await workers.run_artifact(
+            convert_py_to_nb, notebook_py, execute=False, workspace=workspace
+        )
 
     @reactive.calc
-    def notebook_html():
-        return convert_nb_to_html(notebook_nb())
+    async def notebook_html():
+        artifacts = await notebook_artifacts()
+        # The rendering runs in a process, so just wait for it, without a thread.
+        # It may be shared by other sessions, so it isn't cancelled with this one.
+        return await asyncio.shield(asyncio.wrap_future(artifacts.html_future))
 
     @reactive.calc
-    def notebook_html_unexecuted():
-        return convert_nb_to_html(notebook_nb_unexecuted())
+    async def notebook_html_unexecuted():
+        return await workers.run_in_process(
+            convert_nb_to_html, await notebook_nb_unexecuted()
+        )
 
     @reactive.calc
-    def notebook_pdf():
-        return convert_nb_to_pdf(notebook_nb())
+    async def notebook_pdf():
+        artifacts = await notebook_artifacts()
+        return await asyncio.shield(asyncio.wrap_future(artifacts.pdf_future))
 
     @reactive.calc
-    def notebook_pdf_unexecuted():
-        return convert_nb_to_pdf(notebook_nb_unexecuted())
+    async def notebook_pdf_unexecuted():
+        return await workers.run_in_process(
+            convert_nb_to_pdf, await notebook_nb_unexecuted()
+        )
+
+    async def make_script():
+        return await workers.run(ScriptGenerator(analysis_plan()).make_py)
+
+    async def report_txt():
+        return (await notebook_artifacts()).report_txt
+
+    async def report_csv():
+        return (await notebook_artifacts()).report_csv
 
     @render.download(
         filename="dp-wizard-script.py",
         media_type="text/x-python",
     )
     async def download_script():
-        yield make_download_or_modal_error(ScriptGenerator(analysis_plan()).make_py)
+        yield await make_download_or_modal_error(make_script)
 
     @render.download(
         filename="dp-wizard-notebook.py",
@@ -242,68 +299,60 @@ def results_server(
     async def download_notebook_source():
         with ui.Progress() as progress:
             progress.set(message=wait_message)
-            yield NotebookGenerator(analysis_plan()).make_py()
+            yield NotebookGenerator(analysis_plan(), report_dir=workspace).make_py()
 
     @render.download(
         filename="dp-wizard-notebook.ipynb",
         media_type="application/x-ipynb+json",
     )
     async def download_notebook():
-        yield make_download_or_modal_error(notebook_nb)
+        yield await make_download_or_modal_error(notebook_nb)
 
     @render.download(
         filename="dp-wizard-notebook-unexecuted.ipynb",
         media_type="application/x-ipynb+json",
     )
     async def download_notebook_unexecuted():
-        yield make_download_or_modal_error(notebook_nb_unexecuted)
+        yield await make_download_or_modal_error(notebook_nb_unexecuted)
 
     @render.download(  # pyright: ignore
         filename="dp-wizard-notebook.html",
         media_type="text/html",
     )
     async def download_html():
-        yield make_download_or_modal_error(notebook_html)
+        yield await make_download_or_modal_error(notebook_html)
 
     @render.download(  # pyright: ignore
         filename="dp-wizard-notebook-unexecuted.html",
         media_type="text/html",
     )
     async def download_html_unexecuted():
-        yield make_download_or_modal_error(notebook_html_unexecuted)
+        yield await make_download_or_modal_error(notebook_html_unexecuted)
 
     @render.download(
         filename="dp-wizard-notebook.pdf",
         media_type="application/pdf",
     )  # pyright: ignore
     async def download_pdf():
-        yield make_download_or_modal_error(notebook_pdf)
+        yield await make_download_or_modal_error(notebook_pdf)
 
     @render.download(
         filename="dp-wizard-notebook.pdf",
         media_type="application/pdf",
     )  # pyright: ignore
     async def download_pdf_unexecuted():
-        yield make_download_or_modal_error(notebook_pdf_unexecuted)
+        yield await make_download_or_modal_error(notebook_pdf_unexecuted)
 
     @render.download(
         filename="dp-wizard-report.txt",
         media_type="text/plain",
     )
     async def download_report():
-        def make_report():
-            notebook_nb()  # Evaluate just for the side effect of creating report.
-            return (Path(__file__).parent.parent / "tmp" / "report.txt").read_text()
-
-        yield make_download_or_modal_error(make_report)
+        yield await make_download_or_modal_error(report_txt)
 
     @render.download(
         filename="dp-wizard-report.csv",
         media_type="text/plain",
     )
     async def download_table():
-        def make_table():
-            notebook_nb()  # Evaluate just for the side effect of creating report.
-            return (Path(__file__).parent.parent / "tmp" / "report.csv").read_text()
-
-        yield make_download_or_modal_error(make_table)
+        yield await make_download_or_modal_error(report_csv)
@@ -3,13 +3,16 @@ from pathlib import Path
 import argparse
 from typing import NamedTuple
 
+from dp_wizard.utils.csv_helper import data_extensions
+
 
 def _existing_csv_type(arg: str) -> Path:
     path = Path(arg)
     if not path.exists():
         raise argparse.ArgumentTypeError(f"No such file: {arg}")
-    if path.suffix != ".csv":
-        raise argparse.ArgumentTypeError(f'Must have ".csv" extension: {arg}')
+    if path.suffix.lower() not in data_extensions:
+        extensions = ", ".join(f'"{extension}"' for extension in data_extensions)
+        raise argparse.ArgumentTypeError(f"Must have {extensions} extension: {arg}")
     return path
 
 
@@ -52,13 +55,18 @@ Provide both {PUBLIC_PRIVATE_TEXT}
         action="store_true",
         help="Prompt for column names instead of CSV upload",
     )
+    parser.add_argument(
+        "--cache_parquet",
+        action="store_true",
+        help="Convert public CSVs to Parquet once, for faster previews",
+    )
     return parser
 
 
 def _get_args():
     """
     >>> _get_args()
-    Namespace(demo=False, no_uploads=False)
+    Namespace(demo=False, no_uploads=False, cache_parquet=False)
     """
     arg_parser = _get_arg_parser()
 
@@ -75,6 +83,7 @@ def _get_args():
             "demo",
             "contributions",
             "no_uploads",
+            "cache_parquet",
         }
         set_args = [k for k in other_args if getattr(args, k) is not None]
         if set_args:
@@ -88,6 +97,7 @@ def _get_args():
 class CLIInfo(NamedTuple):
     is_demo: bool
     no_uploads: bool
+    cache_parquet: bool = False
 
 
 def get_cli_info() -> CLIInfo:  # pragma: no cover
@@ -95,4 +105,5 @@ def get_cli_info() -> CLIInfo:  # pragma: no cover
     return CLIInfo(
         is_demo=args.demo,
         no_uploads=args.no_uploads,
+        cache_parquet=args.cache_parquet,
     )
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from hashlib import sha256
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Lock
+from typing import Optional
+
+from nbformat import NotebookNode
+import nbformat
+
+from dp_wizard.utils.code_generators import AnalysisPlan
+from dp_wizard.utils.code_generators.notebook_generator import NotebookGenerator
+from dp_wizard.utils.converters import (
+    convert_py_to_nb_node,
+    convert_nb_to_html,
+    convert_nb_to_pdf,
+)
+from dp_wizard.utils.csv_helper import get_csv_fingerprint
+from dp_wizard.utils.workers import worker_pool
+
+
+class NotebookArtifacts:
+    """
+    Everything derived from a single execution of the generated notebook.
+    HTML and PDF rendering start in a worker process the first time
+    they are read, since many users only download the notebook or script.
+    Reading those properties waits for the rendering to finish,
+    and re-raises any error, so a PDF failure doesn't block the other downloads.
+    Each is only rendered once, however many times it is read.
+    """
+
+    def __init__(self, notebook: NotebookNode, report_txt: str, report_csv: str):
+        self.notebook: str = nbformat.writes(notebook)
+        self.report_txt = report_txt
+        self.report_csv = report_csv
+        self._notebook_node = notebook
+        self._lock = Lock()
+        self._html: Optional[Future[str]] = None
+        self._pdf: Optional[Future[bytes]] = None
+
+    @property
+    def html_future(self) -> Future[str]:
+        """
+        Callers on an event loop can await this, rather than holding a thread.
+        """
+        with self._lock:
+            if self._html is None:
+                self._html = worker_pool.submit_to_process(
+                    convert_nb_to_html, self._notebook_node
+                )
+            return self._html
+
+    @property
+    def pdf_future(self) -> Future[bytes]:
+        with self._lock:
+            if self._pdf is None:
+                self._pdf = worker_pool.submit_to_process(
+                    convert_nb_to_pdf, self._notebook_node
+                )
+            return self._pdf
+
+    @property
+    def html(self) -> str:
+        return self.html_future.result()
+
+    @property
+    def pdf(self) -> bytes:
+        return self.pdf_future.result()
+
+
+def make_notebook_artifacts(
+    analysis_plan: AnalysisPlan, workspace: Optional[Path] = None
+) -> NotebookArtifacts:
+    # Each execution writes its reports to its own directory in the workspace,
+    # and they are read back before the directory is removed.
+    # The artifacts are shared by sessions, so the notebook only has
+    # relative report paths, and runs in that directory.
+    # The data path is made absolute, since it is relative to the server.
+    if analysis_plan.csv_path:
+        analysis_plan = analysis_plan._replace(
+            csv_path=str(Path(analysis_plan.csv_path).absolute())
+        )
+    with TemporaryDirectory(prefix="execution-", dir=workspace) as tmp:
+        report_dir = Path(tmp)
+        notebook_py = NotebookGenerator(analysis_plan, report_dir=Path(".")).make_py()
+        notebook = convert_py_to_nb_node(
+            notebook_py, execute=True, workspace=workspace, cwd=report_dir
+        )
+        report_txt = (report_dir / "report.txt").read_text()
+        report_csv = (report_dir / "report.csv").read_text()
+    return NotebookArtifacts(notebook, report_txt, report_csv)
+
+
+def get_plan_key(analysis_plan: AnalysisPlan) -> str:
+    """
+    Returns a hash of the plan and the fingerprint of the data it reads,
+    so the key changes if either changes.
+
+    >>> from dp_wizard.utils.code_generators import AnalysisPlanColumn
+    >>> plan = AnalysisPlan(
+    ...     csv_path="fake.csv",
+    ...     contributions=1,
+    ...     epsilon=1,
+    ...     groups=[],
+    ...     columns={"x": AnalysisPlanColumn("Histogram", 0, 10, 5, 1)},
+    ... )
+    >>> get_plan_key(plan) == get_plan_key(plan._replace(columns=dict(plan.columns)))
+    True
+    >>> get_plan_key(plan) == get_plan_key(plan._replace(epsilon=2))
+    False
+    """
+    csv_path = analysis_plan.csv_path
+    data_fingerprint = (
+        get_csv_fingerprint(Path(csv_path))
+        if csv_path and Path(csv_path).is_file()
+        else None
+    )
+    return sha256(repr((analysis_plan, data_fingerprint)).encode()).hexdigest()
+
+
+class NotebookArtifactsCache:
+    """
+    Shares NotebookArtifacts between sessions, keyed by get_plan_key.
+    If a second request for a plan arrives while the first is still
+    executing, it waits for that result instead of running the notebook again.
+    The workspace is only used while executing, and the bundle is held in memory,
+    so it can be shared even though the workspace belongs to one session.
+    Failures are not cached, so a later request can retry.
+    The least recently used bundle is evicted when there are more than max_size.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self._max_size = max_size
+        self._lock = Lock()
+        self._futures: OrderedDict[str, Future[NotebookArtifacts]] = OrderedDict()
+
+    def get(
+        self, analysis_plan: AnalysisPlan, workspace: Optional[Path] = None
+    ) -> NotebookArtifacts:
+        key = get_plan_key(analysis_plan)
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if future is None:
+                future = Future()
+                self._futures[key] = future
+                while len(self._futures) > self._max_size:
+                    self._futures.popitem(last=False)
+            else:
+                self._futures.move_to_end(key)
+        if is_owner:
+            try:
+                future.set_result(make_notebook_artifacts(analysis_plan, workspace))
+            except Exception as e:
+                with self._lock:
+                    if self._futures.get(key) is future:
+                        del self._futures[key]
+                future.set_exception(e)
+        return future.result()
+
+
+notebook_artifacts_cache = NotebookArtifactsCache()
@@ -5,12 +5,24 @@ import re
 from dp_wizard.utils.code_template import Template
 
 
+# Quantiles are released together, and share one grid of candidates
+# from the lower to the upper bound: See make_candidates for the spacings.
+default_alphas = (0.25, 0.5, 0.75)
+default_candidate_count = 101
+default_candidate_spacing = "linear"
+
+
 class AnalysisPlanColumn(NamedTuple):
     analysis_type: str
     lower_bound: float
     upper_bound: float
     bin_count: int
     weight: int
+    alphas: tuple[float, ...] = default_alphas
+    candidate_count: int = default_candidate_count
+    candidate_spacing: str = default_candidate_spacing
+    # (probability, value) pairs from public data, for "public" spacing:
+    public_quantiles: tuple[tuple[float, float], ...] = ()
 
 
 class AnalysisPlan(NamedTuple):
@@ -19,6 +31,8 @@ class AnalysisPlan(NamedTuple):
     epsilon: float
     groups: list[str]
     columns: dict[str, AnalysisPlanColumn]
+    # Estimated from public data, if available:
+    max_num_partitions: Optional[int] = None
 
 
 # Public functions used to generate code snippets in the UI;
@@ -43,6 +57,10 @@ def make_column_config_block(
     lower_bound: float,
     upper_bound: float,
     bin_count: int,
+    alphas: tuple[float, ...] = default_alphas,
+    candidate_count: int = default_candidate_count,
+    candidate_spacing: str = default_candidate_spacing,
+    public_quantiles: tuple[tuple[float, float], ...] = (),
 ):
     from dp_wizard.utils.code_generators.analyses import get_analysis_by_name
 
@@ -51,6 +69,10 @@ def make_column_config_block(
         lower_bound=lower_bound,
         upper_bound=upper_bound,
         bin_count=bin_count,
+        alphas=alphas,
+        candidate_count=candidate_count,
+        candidate_spacing=candidate_spacing,
+        public_quantiles=public_quantiles,
     )
 
 
@@ -5,7 +5,7 @@ from dp_wizard.utils.code_generators import (
     make_privacy_unit_block,
 )
 from dp_wizard.utils.code_template import Template
-from dp_wizard.utils.csv_helper import name_to_identifier
+from dp_wizard.utils.csv_helper import name_to_identifier, get_data_format
 from dp_wizard.utils.dp_helper import confidence
 
 
@@ -13,26 +13,127 @@ import black
 
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable
+from threading import Lock
+from typing import Callable, Hashable, Iterable
+import ast
+import re
+
+
+# Line length determined by PDF rendering.
+_line_length = 74
+
+
+@lru_cache(maxsize=1024)
+def _format(code: str, indent: int = 0) -> str:
+    """
+    Format one fragment of the generated code, for a block with the given indent,
+    so fragments which haven't changed aren't formatted again.
+    Black allows fewer blank lines inside a block than at the top level.
+
+    >>> code = "def f():\\n    return [\\n1,2]\\n\\n\\n\\nx=1"
+    >>> print(_format(code, indent=4), end="|")
+    def f():
+        return [1, 2]
+    <BLANKLINE>
+    x = 1
+    |
+    """
+    formatted = black.format_str(
+        code, mode=black.Mode(line_length=_line_length - indent)
+    )
+    if indent:
+        while "\n\n\n" in formatted:
+            formatted = formatted.replace("\n\n\n", "\n\n")
+    elif _ends_with_definition(formatted):
+        # Black puts two blank lines after a top-level definition.
+        formatted += "\n"
+    return formatted
+
+
+def _ends_with_definition(code: str) -> bool:
+    """
+    >>> _ends_with_definition("def f():\\n    pass\\n")
+    True
+    >>> _ends_with_definition("x = 1\\n")
+    False
+    """
+    body = ast.parse(code).body
+    return bool(body) and isinstance(
+        body[-1], (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    )
+
+
+def _join_fragments(code: str) -> str:
+    """
+    Fragments are formatted on their own, so where they meet
+    the blank lines are normalized the way Black would.
+
+    >>> _join_fragments("x = 1\\n\\n\\n\\n\\ny = 2\\n\\n")
+    'x = 1\\n\\n\\ny = 2\\n'
+    """
+    return re.sub(r"\n{4,}", "\n\n\n", code).rstrip("\n") + "\n"
+
+
+class FragmentCache:
+    """
+    Formatted fragments of generated code, shared by all generators.
+    Each fragment is keyed by everything it depends on: Usually a column's name
+    and AnalysisPlanColumn, and the plan-level fields the fragment uses,
+    so when a plan changes, only the fragments for the changed columns are made.
+    The least recently used fragment is evicted when there are more than max_size.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self._max_size = max_size
+        self._lock = Lock()
+        self._fragments: OrderedDict[Hashable, str] = OrderedDict()
+
+    def get(self, key: Hashable, make_fragment: Callable[[], str]) -> str:
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                return fragment
+        # Two threads could both make a fragment, but they would be the same.
+        fragment = make_fragment()
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self._max_size:
+                self._fragments.popitem(last=False)
+        return fragment
+
+
+fragment_cache = FragmentCache()
 
 
 class AbstractGenerator(ABC):
     root_template = "placeholder"
+    # Indent of the context and queries in the root template:
+    block_indent = 0
 
-    def __init__(self, analysis_plan: AnalysisPlan):
+    def __init__(self, analysis_plan: AnalysisPlan, single_pass: bool = True):
+        # If there is more than one query, read the CSV once and keep
+        # the columns they need in memory, rather than rescanning for each query.
+        self.single_pass = single_pass
         self.csv_path = analysis_plan.csv_path
         self.contributions = analysis_plan.contributions
         self.epsilon = analysis_plan.epsilon
         self.groups = analysis_plan.groups
         self.columns = analysis_plan.columns
+        self.max_num_partitions = analysis_plan.max_num_partitions or 100
 
     @abstractmethod
-    def _make_context(self) -> str: ...  # pragma: no cover
+    def _make_csv_path_expression(self) -> str: ...  # pragma: no cover
 
     def _make_extra_blocks(self):
         return {}
 
+    def _make_extra_expressions(self):
+        return {}
+
     def _make_python_cell(self, block) -> str:
         """
         Default to just pass through.
@@ -43,21 +144,27 @@ class AbstractGenerator(ABC):
         return "".join(f"# {line}\n" for line in comment.splitlines())
 
     def make_py(self):
+        # Each fragment is formatted on its own, so the whole file
+        # doesn't need to be formatted again when one column changes.
         code = (
             Template(self.root_template, __file__)
-            .fill_expressions(DEPENDENCIES="'opendp[polars]==0.13.0' matplotlib")
+            .fill_expressions(
+                DEPENDENCIES="'opendp[polars]==0.13.0' matplotlib",
+                **self._make_extra_expressions(),
+            )
             .fill_blocks(
-                IMPORTS_BLOCK=Template("imports", __file__).finish(),
-                UTILS_BLOCK=(Path(__file__).parent.parent / "shared.py").read_text(),
+                IMPORTS_BLOCK=_format(Template("imports", __file__).finish()),
+                UTILS_BLOCK=_format(
+                    (Path(__file__).parent.parent / "shared.py").read_text()
+                ),
                 COLUMNS_BLOCK=self._make_columns(),
-                CONTEXT_BLOCK=self._make_context(),
+                CONTEXT_BLOCK=_format(self._make_context(), self.block_indent),
                 QUERIES_BLOCK=self._make_queries(),
                 **self._make_extra_blocks(),
             )
             .finish()
         )
-        # Line length determined by PDF rendering.
-        return black.format_str(code, mode=black.Mode(line_length=74))
+        return _join_fragments(code)
 
     def _make_margins_list(self, bin_names: Iterable[str], groups: Iterable[str]):
         groups_str = ", ".join(f"'{g}'" for g in groups)
@@ -70,7 +177,7 @@ class AbstractGenerator(ABC):
             #
             # In production, "max_num_partitions" should be set by considering the number
             # of possible values for each grouping column, and taking their product.
-            dp.polars.Margin(by=[{groups_str}], public_info='keys', max_partition_length=1000000, max_num_partitions=100),
+            dp.polars.Margin(by=[{groups_str}], public_info='keys', max_partition_length=1000000, max_num_partitions={self.max_num_partitions}),
             """  # noqa: B950 (too long!)
             ]
             + [
@@ -88,12 +195,21 @@ class AbstractGenerator(ABC):
 
     def _make_column_config_dict(self):
         return {
-            name: make_column_config_block(
-                name=name,
-                analysis_type=col.analysis_type,
-                lower_bound=col.lower_bound,
-                upper_bound=col.upper_bound,
-                bin_count=col.bin_count,
+            name: fragment_cache.get(
+                ("column", name, col),
+                lambda name=name, col=col: _format(
+                    make_column_config_block(
+                        name=name,
+                        analysis_type=col.analysis_type,
+                        lower_bound=col.lower_bound,
+                        upper_bound=col.upper_bound,
+                        bin_count=col.bin_count,
+                        alphas=col.alphas,
+                        candidate_count=col.candidate_count,
+                        candidate_spacing=col.candidate_spacing,
+                        public_quantiles=col.public_quantiles,
+                    )
+                ),
             )
             for name, col in self.columns.items()
         }
@@ -104,11 +220,20 @@ class AbstractGenerator(ABC):
     def _make_queries(self):
         to_return = [
             self._make_python_cell(
-                f"confidence = {confidence} # {self._make_confidence_note()}"
+                _format(
+                    f"confidence = {confidence} # {self._make_confidence_note()}",
+                    self.block_indent,
+                ).rstrip("\n")
             )
         ]
-        for column_name in self.columns.keys():
-            to_return.append(self._make_query(column_name))
+        for column_name, plan in self.columns.items():
+            # Queries depend on the grouping columns, as well as the column.
+            to_return.append(
+                fragment_cache.get(
+                    ("query", type(self), tuple(self.groups), column_name, plan),
+                    lambda column_name=column_name: self._make_query(column_name),
+                )
+            )
 
         return "\n".join(to_return)
 
@@ -136,11 +261,11 @@ class AbstractGenerator(ABC):
 
         return (
             self._make_comment_cell(f"### Query for `{column_name}`:")
-            + self._make_python_cell(query)
-            + self._make_python_cell(output)
+            + self._make_python_cell(_format(query, self.block_indent))
+            + self._make_python_cell(_format(output, self.block_indent))
         )
 
-    def _make_partial_context(self):
+    def _make_context(self):
         weights = [column.weight for column in self.columns.values()]
 
         from dp_wizard.utils.code_generators.analyses import get_analysis_by_name
@@ -160,11 +285,16 @@ class AbstractGenerator(ABC):
         )
         extra_columns = ", ".join(
             [
-                f"{name_to_identifier(name)}_bin_expr"
+                extra_column_name
                 for name, plan in self.columns.items()
-                if get_analysis_by_name(plan.analysis_type).has_bins()
+                for extra_column_name in get_analysis_by_name(
+                    plan.analysis_type
+                ).make_extra_column_names(name_to_identifier(name))
             ]
         )
+        data_block = (
+            Template("single_pass", __file__).finish() if self._is_single_pass() else ""
+        )
         return (
             Template("context", __file__)
             .fill_expressions(
@@ -173,9 +303,43 @@ class AbstractGenerator(ABC):
             )
             .fill_values(
                 WEIGHTS=weights,
+                COLUMN_NAMES=self._get_column_names(),
             )
             .fill_blocks(
                 PRIVACY_UNIT_BLOCK=privacy_unit_block,
                 PRIVACY_LOSS_BLOCK=privacy_loss_block,
+                SCAN_BLOCK=self._make_scan_block(),
+                DATA_BLOCK=data_block,
             )
+            .finish()
         )
+
+    def _make_scan_block(self):
+        # The format is chosen when the code is generated,
+        # so the generated code only has the relevant scan.
+        data_format = self._get_data_format()
+        template = Template(f"scan_{data_format}", __file__).fill_expressions(
+            CSV_PATH=self._make_csv_path_expression()
+        )
+        if data_format == "csv":
+            template.fill_expressions(
+                SCHEMA_OVERRIDES=self._make_schema_overrides()
+            ).fill_values(INFER_SCHEMA=bool(self.groups))
+        return template.finish()
+
+    def _get_data_format(self) -> str:
+        return get_data_format(Path(self.csv_path or ""))
+
+    def _is_single_pass(self):
+        return self.single_pass and len(self.columns) > 1
+
+    def _get_column_names(self) -> list[str]:
+        """
+        The columns which the queries read: Analysed and grouping columns.
+        """
+        # dict.fromkeys drops duplicates, but preserves order.
+        return list(dict.fromkeys([*self.columns.keys(), *self.groups]))
+
+    def _make_schema_overrides(self) -> str:
+        # Every analysis casts its column to float.
+        return "{" + ", ".join(f"{name!r}: pl.Float64" for name in self.columns) + "}"
@@ -11,6 +11,14 @@ class Analysis(Protocol):  # pragma: no cover
     @staticmethod
     def has_bins() -> bool: ...
 
+    @staticmethod
+    def make_extra_column_names(identifier: str) -> list[str]:
+        """
+        Expressions from the column config block
+        which add columns to the data before the context is made.
+        """
+        ...
+
     @staticmethod
     def make_query(
         code_gen: AbstractGenerator,
@@ -40,6 +48,10 @@ class Analysis(Protocol):  # pragma: no cover
         lower_bound: float,
         upper_bound: float,
         bin_count: int,
+        alphas: tuple[float, ...],
+        candidate_count: int,
+        candidate_spacing: str,
+        public_quantiles: tuple[tuple[float, float], ...],
     ) -> str: ...
 
 
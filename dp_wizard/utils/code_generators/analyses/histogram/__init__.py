@@ -8,6 +8,10 @@ def has_bins():
     return True
 
 
+def make_extra_column_names(identifier):
+    return [f"{identifier}_bin_expr"]
+
+
 def make_query(code_gen, identifier, accuracy_name, stats_name):
     return (
         Template("histogram_query", __file__)
@@ -55,7 +59,16 @@ def make_report_kv(name, confidence, identifier):
     )
 
 
-def make_column_config_block(column_name, lower_bound, upper_bound, bin_count):
+def make_column_config_block(
+    column_name,
+    lower_bound,
+    upper_bound,
+    bin_count,
+    alphas,
+    candidate_count,
+    candidate_spacing,
+    public_quantiles,
+):
     from dp_wizard.utils.code_generators import snake_case
 
     snake_name = snake_case(column_name)
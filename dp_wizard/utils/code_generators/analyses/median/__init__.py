@@ -8,6 +8,10 @@ def has_bins():
     return False  # pragma: no cover
 
 
+def make_extra_column_names(identifier):
+    return []
+
+
 def make_query(code_gen, identifier, accuracy_name, stats_name):
     return (  # pragma: no cover
         Template("median_query", __file__)
@@ -39,19 +43,41 @@ def make_report_kv(name, confidence, identifier):
     )  # pragma: no cover
 
 
-def make_column_config_block(column_name, lower_bound, upper_bound, bin_count):
+def make_column_config_block(
+    column_name,
+    lower_bound,
+    upper_bound,
+    bin_count,
+    alphas,
+    candidate_count,
+    candidate_spacing,
+    public_quantiles,
+):
     from dp_wizard.utils.code_generators import snake_case
+    from dp_wizard.utils.code_generators.analyses.quantile import (
+        make_candidates_block,
+    )
 
     snake_name = snake_case(column_name)
+    candidates_name = f"{snake_name}_candidates"
     return (
         Template("median_expr", __file__)
         .fill_expressions(
             EXPR_NAME=f"{snake_name}_expr",
+            CANDIDATES_NAME=candidates_name,
         )
         .fill_values(
             COLUMN_NAME=column_name,
-            LOWER_BOUND=lower_bound,
-            UPPER_BOUND=upper_bound,
+        )
+        .fill_blocks(
+            CANDIDATES_BLOCK=make_candidates_block(
+                candidates_name,
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                candidate_count=candidate_count,
+                candidate_spacing=candidate_spacing,
+                public_quantiles=public_quantiles,
+            ),
         )
         .finish()
     )  # pragma: no cover
@@ -1,13 +1,17 @@
 from dp_wizard.utils.code_template import Template
 
 
-name = "Quantile"
+name = "Quantiles"
 
 
 def has_bins():
     return False
 
 
+def make_extra_column_names(identifier):
+    return []
+
+
 def make_query(code_gen, identifier, accuracy_name, stats_name):
     return (
         Template("quantile_query", __file__)
@@ -47,19 +51,68 @@ def make_report_kv(name, confidence, identifier):
     )
 
 
-def make_column_config_block(column_name, lower_bound, upper_bound, bin_count):
+def make_column_config_block(
+    column_name,
+    lower_bound,
+    upper_bound,
+    bin_count,
+    alphas,
+    candidate_count,
+    candidate_spacing,
+    public_quantiles,
+):
     from dp_wizard.utils.code_generators import snake_case
 
     snake_name = snake_case(column_name)
+    candidates_name = f"{snake_name}_candidates"
     return (
         Template("quantile_expr", __file__)
         .fill_expressions(
             EXPR_NAME=f"{snake_name}_expr",
+            CANDIDATES_NAME=candidates_name,
         )
         .fill_values(
             COLUMN_NAME=column_name,
+            ALPHAS=list(alphas),
+        )
+        .fill_blocks(
+            CANDIDATES_BLOCK=make_candidates_block(
+                candidates_name,
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                candidate_count=candidate_count,
+                candidate_spacing=candidate_spacing,
+                public_quantiles=public_quantiles,
+            ),
+        )
+        .finish()
+    )
+
+
+def make_candidates_block(
+    candidates_name,
+    lower_bound,
+    upper_bound,
+    candidate_count,
+    candidate_spacing,
+    public_quantiles,
+):
+    """
+    Also used for the median.
+    """
+    return (
+        Template("quantile_candidates", __file__)
+        .fill_expressions(
+            CANDIDATES_NAME=candidates_name,
+        )
+        .fill_values(
             LOWER_BOUND=lower_bound,
             UPPER_BOUND=upper_bound,
+            CANDIDATE_COUNT=candidate_count,
+            CANDIDATE_SPACING=candidate_spacing,
+            PUBLIC_QUANTILES=public_quantiles,
         )
         .finish()
+        # The block is followed by the expression.
+        .rstrip()
     )
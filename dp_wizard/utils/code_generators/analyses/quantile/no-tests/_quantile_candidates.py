@@ -0,0 +1,8 @@
+# More candidates give finer results, but take longer to release.
+CANDIDATES_NAME = make_candidates(
+    lower_bound=LOWER_BOUND,
+    upper_bound=UPPER_BOUND,
+    candidate_count=CANDIDATE_COUNT,
+    spacing=CANDIDATE_SPACING,
+    public_quantiles=PUBLIC_QUANTILES,
+)
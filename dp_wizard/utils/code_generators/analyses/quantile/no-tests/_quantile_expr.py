@@ -1,10 +1,16 @@
-# See the OpenDP docs for more on making private Quantile releases:
+# See the OpenDP docs for more on making private medians and quantiles:
+# https://docs.opendp.org/en/stable/getting-started/tabular-data/essential-statistics.html#Median
 
-EXPR_NAME = (
+# The candidates are made once, and shared by all the quantiles.
+# The quantiles are released by one query,
+# so the budget for this column is split evenly between them.
+CANDIDATES_BLOCK
+EXPR_NAME = [
     pl.col(COLUMN_NAME)
     .cast(float)
     .fill_nan(0)
     .fill_null(0)
-    .dp.quantile(0.75, make_cut_points(LOWER_BOUND, UPPER_BOUND, bin_count=100))
-    .alias("quantile")
-)
+    .dp.quantile(alpha, CANDIDATES_NAME)
+    .alias(str(alpha))
+    for alpha in ALPHAS
+]
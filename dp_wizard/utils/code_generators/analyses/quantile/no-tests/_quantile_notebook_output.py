@@ -1,6 +1,7 @@
 if groups:
-    title = (
-        f"DP Quantiles for COLUMN_NAME, "
-        f"assuming {contributions} contributions per individual"
-    )
-    plot_bars(STATS_NAME, error=0, cutoff=0, title=title)
+    for alpha in [name for name in STATS_NAME.columns if name not in groups]:
+        title = (
+            f"DP {alpha} Quantile for COLUMN_NAME, "
+            f"assuming {contributions} contributions per individual"
+        )
+        plot_bars(STATS_NAME.select(*groups, alpha), error=0, cutoff=0, title=title)
@@ -1,7 +1,11 @@
 NAME: {
-    "quantile": (
-        dict(zip(*df_to_columns(IDENTIFIER_STATS)))
+    "quantiles": (
+        {
+            alpha: dict(zip(*df_to_columns(IDENTIFIER_STATS.select(*groups, alpha))))
+            for alpha in IDENTIFIER_STATS.columns
+            if alpha not in groups
+        }
         if groups
-        else IDENTIFIER_STATS.item()
+        else IDENTIFIER_STATS.row(0, named=True)
     ),
 }
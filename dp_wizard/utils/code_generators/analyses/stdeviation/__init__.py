@@ -7,9 +7,16 @@ def has_bins():
     return False
 
 
+def make_extra_column_names(identifier):
+    return [f"{identifier}_squared_expr"]
+
+
 def make_query(code_gen, identifier, accuracy_name, stats_name):
     return (
         Template("stdeviation_query", __file__)
+        .fill_values(
+            GROUP_NAMES=code_gen.groups,
+        )
         .fill_expressions(
             QUERY_NAME=f"{identifier}_query",
             STATS_NAME=stats_name,
@@ -43,19 +50,53 @@ def make_report_kv(name, confidence, identifier):
     )
 
 
-def make_column_config_block(column_name, lower_bound, upper_bound, bin_count):
+def make_column_config_block(
+    column_name,
+    lower_bound,
+    upper_bound,
+    bin_count,
+    alphas,
+    candidate_count,
+    candidate_spacing,
+    public_quantiles,
+):
     from dp_wizard.utils.code_generators import snake_case
 
     snake_name = snake_case(column_name)
+    squared_lower_bound, squared_upper_bound = get_squared_bounds(
+        lower_bound, upper_bound
+    )
     return (
         Template("stdeviation_expr", __file__)
         .fill_expressions(
             EXPR_NAME=f"{snake_name}_expr",
+            SQUARED_EXPR_NAME=f"{snake_name}_squared_expr",
         )
         .fill_values(
             COLUMN_NAME=column_name,
+            SQUARED_COLUMN_NAME=f"{snake_name}_squared",
             LOWER_BOUND=lower_bound,
             UPPER_BOUND=upper_bound,
+            SQUARED_LOWER_BOUND=squared_lower_bound,
+            SQUARED_UPPER_BOUND=squared_upper_bound,
         )
         .finish()
     )
+
+
+def get_squared_bounds(lower_bound, upper_bound):
+    """
+    Bounds on the squares of values between lower_bound and upper_bound.
+
+    >>> get_squared_bounds(2, 3)
+    (4, 9)
+    >>> get_squared_bounds(-3, -2)
+    (4, 9)
+    >>> get_squared_bounds(-2, 3)
+    (0, 9)
+    """
+    if lower_bound >= 0:
+        return (lower_bound**2, upper_bound**2)
+    if upper_bound <= 0:
+        return (upper_bound**2, lower_bound**2)
+    return (0, max(lower_bound**2, upper_bound**2))
@@ -1,51 +1,31 @@
-# Manually calculating standard deviation
-
-EXPR_NAME = (
-    pl.col(COLUMN_NAME).fill_nan(0).fill_null(0).dp.mean((LOWER_BOUND, UPPER_BOUND))
+# See the OpenDP docs for more on making private sums:
+# https://docs.opendp.org/en/stable/getting-started/tabular-data/essential-statistics.html#Sum
+#
+# The standard deviation is derived from the sum, the sum of squares,
+# and the count, which are all released by a single query.
+# Squares can't be computed inside the query,
+# so they are added as a new column before the context is made:
+SQUARED_EXPR_NAME = (
+    pl.col(COLUMN_NAME)
+    .cast(float)
+    .fill_nan(0)
+    .fill_null(0)
+    .clip(LOWER_BOUND, UPPER_BOUND)
+    .pow(2)
+    .alias(SQUARED_COLUMN_NAME)
 )
 
-"""
-import polars as pl
-import numpy as np
-import opendp.prelude as dp
-
-dp.enable_features("contrib")
-
-size = 10_000
-x = np.random.normal(size=size)
-lf = pl.LazyFrame({"x": x})
-
-
-mean = (
-    dp.Context.compositor(
-        data=pl.LazyFrame({"x": x}),
-        privacy_unit=dp.unit_of(contributions=1),
-        privacy_loss=dp.loss_of(epsilon=0.5),
-        split_evenly_over=1,
-        margins=[dp.polars.Margin(max_partition_length=size)],
-    )
-    .query()
-    .select(pl.col("x").fill_nan(0).fill_null(0).dp.mean((-10, 10)))
-    .release()
-    .collect()
-    .item()
-)
-
-print(mean)
-
-var = (
-    dp.Context.compositor(
-        data=pl.LazyFrame({"devs": (x - mean)**2}),
-        privacy_unit=dp.unit_of(contributions=1),
-        privacy_loss=dp.loss_of(epsilon=0.5),
-        split_evenly_over=1,
-        margins=[dp.polars.Margin(max_partition_length=size)],
-    )
-    .query()
-    .select(pl.col("devs").fill_nan(0).fill_null(0).dp.mean((-10, 10)))
-    .release()
-    .collect()
-    .item()
-)
-print(np.sqrt(var))
-"""
+EXPR_NAME = [
+    pl.col(COLUMN_NAME)
+    .cast(float)
+    .fill_nan(0)
+    .fill_null(0)
+    .dp.sum((LOWER_BOUND, UPPER_BOUND))
+    .alias("sum"),
+    pl.col(SQUARED_COLUMN_NAME)
+    .fill_nan(0)
+    .fill_null(0)
+    .dp.sum((SQUARED_LOWER_BOUND, SQUARED_UPPER_BOUND))
+    .alias("sum_of_squares"),
+    pl.len().dp.noise().alias("count"),
+]
@@ -1,6 +1,6 @@
-title = (
-    f"DP Standard Deviation for COLUMN_NAME, "
-    f"assuming {contributions} contributions per individual"
-)
-# plot_bars(STATS_NAME, error=0, cutoff=0, title=title, epsilon=1)
-STATS_NAME
+if groups:
+    title = (
+        f"DP standard deviations for COLUMN_NAME, "
+        f"assuming {contributions} contributions per individual"
+    )
+    plot_bars(STATS_NAME, error=0, cutoff=0, title=title)
@@ -1,55 +1,25 @@
-import polars as pl
-import numpy as np
-import opendp.prelude as dp
-
-dp.enable_features("contrib")
-
-size = 10_000
-x = np.random.normal(size=size)
-lf = pl.LazyFrame({"x": x})
-
-mean = (
-    dp.Context.compositor(
-        data=pl.LazyFrame({"x": x}),
-        privacy_unit=dp.unit_of(contributions=1),
-        privacy_loss=dp.loss_of(epsilon=0.5),
-        split_evenly_over=1,
-        margins=[dp.polars.Margin(max_partition_length=size)],
-    )
-    .query()
-    .select(pl.col("x").fill_nan(0).fill_null(0).dp.mean((-10, 10)))
-    .release()
-    .collect()
-    .item()
-)
-
-print(f"Mean: {mean}")
-
-var = (
-    dp.Context.compositor(
-        data=pl.LazyFrame({"devs": (x - mean) ** 2}),
-        privacy_unit=dp.unit_of(contributions=1),
-        privacy_loss=dp.loss_of(epsilon=0.5),
-        split_evenly_over=1,
-        margins=[dp.polars.Margin(max_partition_length=size)],
-    )
-    .query()
-    .select(pl.col("devs").fill_nan(0).fill_null(0).dp.mean((-10, 10)))
-    .release()
-    .collect()
-    .item()
-)
-
-std = np.sqrt(var)
-
-print(f"Standard Deviation: {std}")
-
-"""
+groups = GROUP_NAMES
 QUERY_NAME = (
     context.query().group_by(groups).agg(EXPR_NAME)
     if groups
     else context.query().select(EXPR_NAME)
 )
-"""
-
-STATS_NAME = std
+STATS_NAME = (
+    QUERY_NAME.release()
+    .collect()
+    # With noise, the count could be less than one,
+    # or the variance could be negative, so both are clipped.
+    .with_columns(pl.col("count").clip(lower_bound=1))
+    .select(
+        *groups,
+        # The variance is the mean of the squares, minus the square of the mean.
+        (
+            pl.col("sum_of_squares") / pl.col("count")
+            - (pl.col("sum") / pl.col("count")).pow(2)
+        )
+        .clip(lower_bound=0)
+        .sqrt()
+        .alias("stdeviation"),
+    )
+)
+STATS_NAME
@@ -1,3 +1,7 @@
 NAME: {
-    "stdeviation": (IDENTIFIER_STATS.item()),
+    "stdeviation": (
+        dict(zip(*df_to_columns(IDENTIFIER_STATS)))
+        if groups
+        else IDENTIFIER_STATS.item()
+    ),
 }
@@ -1,9 +1,13 @@
 PRIVACY_UNIT_BLOCK
 PRIVACY_LOSS_BLOCK
+SCAN_BLOCK
+# Only read the columns the queries need.
+data = data.select(COLUMN_NAMES).with_columns(EXTRA_COLUMNS)
+DATA_BLOCK
 # See the OpenDP docs for more on Context:
 # https://docs.opendp.org/en/stable/api/user-guide/context/index.html#context:
 context = dp.Context.compositor(
-    data=pl.scan_csv(CSV_PATH, encoding="utf8-lossy").with_columns(EXTRA_COLUMNS),
+    data=data,
     privacy_unit=privacy_unit,
     privacy_loss=privacy_loss,
     split_by_weights=WEIGHTS,
@@ -38,13 +38,7 @@ COLUMNS_BLOCK
 CONTEXT_BLOCK
 # -
 
-# A note on `utf8-lossy`: CSVs can use different "character encodings" to
-# represent characters outside the plain ascii character set, but out of the box
-# the Polars library only supports UTF8. Specifying `utf8-lossy` preserves as
-# much information as possible, and any unrecognized characters will be replaced
-# by "�". If this is not sufficient, you will need to preprocess your data to
-# reencode it as UTF8.
-#
+ENCODING_NOTE_BLOCK
 # ## Results
 #
 # Finally, we run the queries and plot the results.
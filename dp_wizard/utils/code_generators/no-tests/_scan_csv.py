@@ -0,0 +1,8 @@
+data = pl.scan_csv(
+    CSV_PATH,
+    encoding="utf8-lossy",
+    # Parse the analysed columns as floats:
+    # Types only need to be inferred for grouping columns.
+    schema_overrides=SCHEMA_OVERRIDES,
+    infer_schema=INFER_SCHEMA,
+)
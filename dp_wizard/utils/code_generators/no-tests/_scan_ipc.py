@@ -0,0 +1,2 @@
+# Arrow IPC files record their own types.
+data = pl.scan_ipc(CSV_PATH)
@@ -0,0 +1,2 @@
+# Parquet files record their own types.
+data = pl.scan_parquet(CSV_PATH)
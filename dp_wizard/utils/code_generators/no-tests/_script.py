@@ -20,7 +20,9 @@ if __name__ == "__main__":
         description="Creates a differentially private release from a csv"
     )
     parser.add_argument(
-        "--csv", required=True, help="Path to csv containing private data"
+        "--csv",
+        required=True,
+        help=CSV_HELP,
     )
     args = parser.parse_args()
     context, contributions = get_context_contributions(csv_path=args.csv)
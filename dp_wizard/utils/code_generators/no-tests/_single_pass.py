@@ -0,0 +1,3 @@
+# Each query below would otherwise read the whole file again:
+# Instead, read the data once, and keep it in memory.
+data = data.collect().lazy()
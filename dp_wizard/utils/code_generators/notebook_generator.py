@@ -1,17 +1,34 @@
-from dp_wizard.utils.code_generators.abstract_generator import AbstractGenerator
+from dp_wizard.utils.code_generators import AnalysisPlan
+from dp_wizard.utils.code_generators.abstract_generator import (
+    AbstractGenerator,
+    _format,
+)
 from dp_wizard.utils.code_template import Template
 from dp_wizard.utils.csv_helper import name_to_identifier
 from dp_wizard.utils.dp_helper import confidence
 
 
 from pathlib import Path
+from typing import Optional
+import json
 
 
 class NotebookGenerator(AbstractGenerator):
     root_template = "notebook"
 
-    def _make_context(self):
-        return self._make_partial_context().fill_values(CSV_PATH=self.csv_path).finish()
+    def __init__(
+        self,
+        analysis_plan: AnalysisPlan,
+        report_dir: Optional[Path] = None,
+        single_pass: bool = True,
+    ):
+        super().__init__(analysis_plan, single_pass=single_pass)
+        # Executed notebooks write their reports here:
+        # Callers which run notebooks concurrently should each pass their own dir.
+        self.report_dir = report_dir or Path(__file__).parent.parent.parent / "tmp"
+
+    def _make_csv_path_expression(self):
+        return repr(self.csv_path)
 
     def _make_python_cell(self, block):
         return f"\n# +\n{block}\n# -\n"
@@ -40,19 +57,31 @@ class NotebookGenerator(AbstractGenerator):
             )
             + "}"
         )
-        tmp_path = Path(__file__).parent.parent.parent / "tmp"
         reports_block = (
             Template("reports", __file__)
             .fill_expressions(
                 OUTPUTS=outputs_expression,
-                COLUMNS={k: v._asdict() for k, v in self.columns.items()},
+                COLUMNS={
+                    # YAML would tag tuples, so they are written as lists.
+                    k: json.loads(json.dumps(v._asdict()))
+                    for k, v in self.columns.items()
+                },
             )
             .fill_values(
                 CSV_PATH=self.csv_path,
                 EPSILON=self.epsilon,
-                TXT_REPORT_PATH=str(tmp_path / "report.txt"),
-                CSV_REPORT_PATH=str(tmp_path / "report.csv"),
+                TXT_REPORT_PATH=str(self.report_dir / "report.txt"),
+                CSV_REPORT_PATH=str(self.report_dir / "report.csv"),
             )
             .finish()
         )
-        return {"REPORTS_BLOCK": reports_block}
+        # Only CSVs are read with "utf8-lossy".
+        encoding_note_block = (
+            Template("encoding_note", __file__).finish().rstrip()
+            if self._get_data_format() == "csv"
+            else ""
+        )
+        return {
+            "REPORTS_BLOCK": _format(reports_block),
+            "ENCODING_NOTE_BLOCK": encoding_note_block,
+        }
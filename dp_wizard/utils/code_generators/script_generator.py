@@ -3,6 +3,7 @@ from dp_wizard.utils.code_generators.abstract_generator import AbstractGenerator
 
 class ScriptGenerator(AbstractGenerator):
     root_template = "script"
+    block_indent = 4
 
     def _make_columns(self):
         column_config_dict = self._make_column_config_dict()
@@ -11,10 +12,15 @@ class ScriptGenerator(AbstractGenerator):
             for name, block in column_config_dict.items()
         )
 
-    def _make_context(self):
-        return (
-            self._make_partial_context().fill_expressions(CSV_PATH="csv_path").finish()
-        )
+    def _make_csv_path_expression(self):
+        return "csv_path"
+
+    def _make_extra_expressions(self):
+        file_description = {
+            "parquet": "Parquet file",
+            "ipc": "Arrow IPC file",
+        }.get(self._get_data_format(), "csv")
+        return {"CSV_HELP": f'"Path to {file_description} containing private data"'}
 
     def _make_confidence_note(self):
         # In the superclass, the string is unquoted so it can be
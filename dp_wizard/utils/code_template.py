@@ -1,10 +1,18 @@
-import re
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple, Optional
+import re
+
+
+# Slots:
+# - are all caps or underscores
+# - have word boundary on either side
+# - are at least three characters
+_slot_re = re.compile(r"\b[A-Z][A-Z_]{2,}\b")
 
 
 def _get_body(func):
     import inspect
-    import re
 
     source_lines = inspect.getsource(func).splitlines()
     first_line = source_lines[0]
@@ -19,46 +27,108 @@ def _get_body(func):
     )
 
 
+class _CompiledTemplate(NamedTuple):
+    """
+    A template split at its slots: Each slot follows the segment
+    with the same index, and the last segment follows the last slot.
+    """
+
+    segments: tuple[str, ...]
+    slots: tuple[str, ...]
+    # The indentation of each slot that is alone on its line, otherwise None:
+    block_indents: tuple[Optional[str], ...]
+
+
+@lru_cache(maxsize=256)
+def _compile(text: str) -> _CompiledTemplate:
+    """
+    >>> _compile("a = VALUE\\n    BLOCK\\n")
+    _CompiledTemplate(segments=('a = ', '\\n    ', '\\n'), slots=('VALUE', 'BLOCK'), block_indents=(None, '    '))
+    """  # noqa: B950 (too long!)
+    segments = []
+    slots = []
+    block_indents = []
+    start = 0
+    for match in _slot_re.finditer(text):
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        indent = text[line_start : match.start()]
+        # Just the next character, rather than copying the rest of the text.
+        next_char = text[match.end() : match.end() + 1]
+        is_alone = indent.strip(" \t") == "" and next_char in ("", "\n")
+        segments.append(text[start : match.start()])
+        slots.append(match.group())
+        block_indents.append(indent if is_alone else None)
+        start = match.end()
+    segments.append(text[start:])
+    return _CompiledTemplate(tuple(segments), tuple(slots), tuple(block_indents))
+
+
+@lru_cache(maxsize=256)
+def _load(template, root: str) -> tuple[str, _CompiledTemplate]:
+    """
+    Templates are read and compiled once,
+    and shared by every Template made from them.
+    """
+    # TODO: Check if template is a Path, eventually.
+    # Don't want to introduce a lot of changes right now.
+    template_name = f"_{template}.py"
+    template_path = Path(root).parent / "no-tests" / template_name
+    if template_path.exists():
+        return f"'{template_name}'", _compile(template_path.read_text())
+    if callable(template):
+        return "function template", _compile(_get_body(template))
+    return "string template", _compile(template)
+
+
 class Template:
     def __init__(self, template, root=__file__):
-        # TODO: Check if template is a Path, eventually.
-        # Don't want to introduce a lot of changes right now.
-        template_name = f"_{template}.py"
-        template_path = Path(root).parent / "no-tests" / template_name
-        if template_path.exists():
-            self._source = f"'{template_name}'"
-            self._template = template_path.read_text()
-        else:
-            if callable(template):
-                self._source = "function template"
-                self._template = _get_body(template)
+        self._source, self._compiled = _load(template, root)
+        # Only the slots in the template are filled, and not the filled text,
+        # because substitutions can produce sequences of upper case letters
+        # that could be mistaken for slots.
+        self._fills: dict[str, str] = {}
+        self._blocks: dict[str, str] = {}
+
+    def _render(self) -> str:
+        parts = []
+        for segment, slot, indent in zip(
+            self._compiled.segments,
+            self._compiled.slots,
+            self._compiled.block_indents,
+        ):
+            parts.append(segment)
+            if slot in self._fills:
+                parts.append(self._fills[slot])
+            elif slot in self._blocks and indent is not None:
+                # Blank lines are left empty, rather than indented.
+                first, *rest = self._blocks[slot].split("\n")
+                parts.append(
+                    "\n".join(
+                        [first, *(indent + line if line else line for line in rest)]
+                    )
+                )
             else:
-                self._source = "string template"
-                self._template = template
-        # We want a list of the initial slots, because substitutions
-        # can produce sequences of upper case letters that could be mistaken for slots.
-        self._initial_slots = self._find_slots()
-
-    def _find_slots(self):
-        # Slots:
-        # - are all caps or underscores
-        # - have word boundary on either side
-        # - are at least three characters
-        slot_re = r"\b[A-Z][A-Z_]{2,}\b"
-        return set(re.findall(slot_re, self._template))
+                parts.append(slot)
+        parts.append(self._compiled.segments[-1])
+        return "".join(parts)
+
+    def _is_filled(self, slot: str) -> bool:
+        return slot in self._fills or slot in self._blocks
+
+    def _fill(self, k: str, v, text: str):
+        if k not in self._compiled.slots or self._is_filled(k):
+            raise Exception(
+                f"No '{k}' slot to fill with '{v}' in "
+                f"{self._source}:\n\n{self._render()}"
+            )
+        self._fills[k] = text
 
     def fill_expressions(self, **kwargs):
         """
         Fill in variable names, or dicts or lists represented as strings.
         """
         for k, v in kwargs.items():
-            k_re = re.escape(k)
-            self._template, count = re.subn(rf"\b{k_re}\b", str(v), self._template)
-            if count == 0:
-                raise Exception(
-                    f"No '{k}' slot to fill with '{v}' in "
-                    f"{self._source}:\n\n{self._template}"
-                )
+            self._fill(k, v, str(v))
         return self
 
     def fill_values(self, **kwargs):
@@ -66,13 +136,7 @@ class Template:
         Fill in string or numeric values. `repr` is called before filling.
         """
         for k, v in kwargs.items():
-            k_re = re.escape(k)
-            self._template, count = re.subn(rf"\b{k_re}\b", repr(v), self._template)
-            if count == 0:
-                raise Exception(
-                    f"No '{k}' slot to fill with '{v}' in "
-                    f"{self._source}:\n\n{self._template}"
-                )
+            self._fill(k, v, repr(v))
         return self
 
     def fill_blocks(self, **kwargs):
@@ -82,39 +146,39 @@ class Template:
         for k, v in kwargs.items():
             if not isinstance(v, str):
                 raise Exception(f"For {k} in {self._source}, expected string, not {v}")
-
-            def match_indent(match):
-                # This does what we want, but binding is confusing.
-                return "\n".join(
-                    match.group(1) + line for line in v.split("\n")  # noqa: B023
+            is_block_slot = any(
+                slot == k and indent is not None
+                for slot, indent in zip(
+                    self._compiled.slots, self._compiled.block_indents
                 )
-
-            k_re = re.escape(k)
-            self._template, count = re.subn(
-                rf"^([ \t]*){k_re}$",
-                match_indent,
-                self._template,
-                flags=re.MULTILINE,
             )
-            if count == 0:
+            if not is_block_slot or self._is_filled(k):
+                template = self._render()
                 base_message = (
                     f"No '{k}' slot to fill with '{v}' in "
-                    f"{self._source}:\n\n{self._template}"
+                    f"{self._source}:\n\n{template}"
                 )
-                if k in self._template:
+                if k in template:
                     raise Exception(
                         f"Block slots must be alone on line; {base_message}"
                     )
                 else:
                     raise Exception(base_message)
+            self._blocks[k] = v
         return self
 
     def finish(self):
-        unfilled_slots = self._initial_slots & self._find_slots()
+        unfilled_slots = {
+            slot
+            for slot, indent in zip(self._compiled.slots, self._compiled.block_indents)
+            if not (
+                slot in self._fills or (slot in self._blocks and indent is not None)
+            )
+        }
+        template = self._render()
         if unfilled_slots:
             slots_str = ", ".join(sorted(f"'{slot}'" for slot in unfilled_slots))
             raise Exception(
-                f"{slots_str} slot not filled "
-                f"in {self._source}:\n\n{self._template}"
+                f"{slots_str} slot not filled " f"in {self._source}:\n\n{template}"
             )
-        return self._template
+        return template
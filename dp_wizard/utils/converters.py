@@ -1,21 +1,17 @@
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from dataclasses import dataclass
-import subprocess
-import json
+from typing import Optional
 import nbformat
 import nbconvert
 import jupytext
 import sys
 
+from jupyter_client.kernelspec import KernelSpecManager
+from nbclient import NotebookClient
+from nbclient.exceptions import CellExecutionError
+from nbformat import NotebookNode
 
-def _is_kernel_installed() -> bool:
-    try:
-        # This method isn't well documented, so it may be fragile.
-        jupytext.kernels.kernelspec_from_language("python")  # type: ignore
-        return True
-    except ValueError:  # pragma: no cover
-        return False
+from dp_wizard.utils.kernel_pool import kernel_pool
 
 
 @dataclass(frozen=True)
@@ -27,89 +23,131 @@ class ConversionException(Exception):
         return f"Script to notebook conversion failed: {self.command}\n{self.stderr})"
 
 
-def convert_py_to_nb(python_str: str, execute: bool = False):
+def convert_py_to_nb(
+    python_str: str, execute: bool = False, workspace: Optional[Path] = None
+) -> str:
     """
     Given Python code as a string, returns a notebook as a string.
-    Calls jupytext as a subprocess:
-    Not ideal, but only the CLI is documented well.
+    Conversion is in memory with the jupytext API. If executing,
+    the notebook is run on a pooled kernel which has already imported
+    the dependencies. If execution fails, a copy of the script
+    for debugging is saved in the workspace.
     """
-    with TemporaryDirectory() as temp_dir:
-        if not _is_kernel_installed():
-            subprocess.run(
-                [
-                    sys.executable,
-                    "-m",
-                    "ipykernel",
-                    "install",
-                    "--name",
-                    "kernel_name",
-                    "--user",
-                ],
-                check=True,
-            )
-
-        temp_dir_path = Path(temp_dir)
-        py_path = temp_dir_path / "input.py"
-        py_path.write_text(python_str)
-
-        argv = [
-            sys.executable,
-            "-m",
-            "jupytext",
-            "--from",
-            ".py",
-            "--to",
-            ".ipynb",
-            "--output",
-            "-",
-        ]
-        if execute:
-            argv.append("--execute")
-        argv.append(str(py_path.absolute()))  # type: ignore
-        result = subprocess.run(argv, text=True, capture_output=True)
-        if result.returncode != 0:
-            # If there is an error, we want a copy of the file that will stay around,
-            # outside the "with TemporaryDirectory()" block.
-            # The command we show in the error message isn't exactly what was run,
-            # but it should reproduce the error.
-            debug_path = Path("/tmp/script.py")
-            debug_path.write_text(python_str)
-            argv.pop()
-            argv.append(str(debug_path))  # type: ignore
-            raise ConversionException(command=" ".join(argv), stderr=result.stderr)
-        return _clean_nb(result.stdout.strip())
-
-
-def _clean_nb(nb_json: str):
+    return nbformat.writes(
+        convert_py_to_nb_node(python_str, execute=execute, workspace=workspace)
+    )
+
+
+def convert_py_to_nb_node(
+    python_str: str,
+    execute: bool = False,
+    workspace: Optional[Path] = None,
+    cwd: Optional[Path] = None,
+) -> NotebookNode:
+    """
+    Like convert_py_to_nb, but returns the cleaned notebook node,
+    so it can be rendered to other formats without parsing it again.
+    If executing, relative paths in the notebook are relative to "cwd".
+    """
+    notebook = jupytext.reads(python_str, fmt="py")
+    if execute:
+        _execute_nb(notebook, python_str, workspace, cwd)
+    return _clean_nb(notebook)
+
+
+def _debug_command(python_str: str, workspace: Optional[Path] = None) -> str:
+    """
+    Save a copy of the script, and return a command which should reproduce the error.
+    The command isn't exactly what was run, but the CLI is better documented.
+    """
+    debug_path = (workspace or Path("/tmp")) / "script.py"
+    debug_path.write_text(python_str)
+    argv = [
+        sys.executable,
+        "-m",
+        "jupytext",
+        "--from",
+        ".py",
+        "--to",
+        ".ipynb",
+        "--output",
+        "-",
+        "--execute",
+        str(debug_path),
+    ]
+    return " ".join(argv)
+
+
+def _execute_nb(
+    notebook: NotebookNode,
+    python_str: str,
+    workspace: Optional[Path] = None,
+    cwd: Optional[Path] = None,
+):
     """
-    Given a notebook as a string of JSON, remove the coda and pip output.
+    Execute the notebook in place.
+    The source is only needed for the error message.
+    """
+    kernel_spec = KernelSpecManager().get_kernel_spec(kernel_pool.kernel_name)
+    notebook.metadata["kernelspec"] = {
+        "name": kernel_pool.kernel_name,
+        "language": kernel_spec.language,
+        "display_name": kernel_spec.display_name,
+    }
+    error = None
+    with kernel_pool.kernel(cwd=cwd) as km:
+        client = NotebookClient(notebook, km=km, timeout=None)
+        try:
+            client.execute()
+        except CellExecutionError as e:
+            # ConversionException is frozen, so it can't be raised inside
+            # the context manager, which would set its __traceback__.
+            error = e
+        finally:
+            if client.kc is not None:
+                client.kc.stop_channels()
+    if error is not None:
+        raise ConversionException(
+            command=_debug_command(python_str, workspace),
+            stderr=str(error),
+        )
+
+
+def _clean_nb(nb: NotebookNode) -> NotebookNode:
+    """
+    Given a notebook, remove the coda and pip output.
     (The code produces reports that we do need,
     but the code isn't actually interesting to end users.)
     """
-    nb = json.loads(nb_json)
     new_cells = []
-    for cell in nb["cells"]:
-        if "pip install" in cell["source"][0]:
-            cell["outputs"] = []
-        if "# Coda\n" in cell["source"]:
+    for cell in nb.cells:
+        lines = cell.source.splitlines()
+        if lines and "pip install" in lines[0]:
+            cell.outputs = []
+        if "# Coda" in lines:
             break
         new_cells.append(cell)
-    nb["cells"] = new_cells
-    return json.dumps(nb, indent=1)
+    nb.cells = new_cells
+    return nb
 
 
-def convert_nb_to_html(python_nb: str):
+def convert_nb_to_html(python_nb: str | NotebookNode):
     return convert_nb(python_nb, nbconvert.HTMLExporter)
 
 
-def convert_nb_to_pdf(python_nb: str):
+def convert_nb_to_pdf(python_nb: str | NotebookNode):
     # PDFExporter uses LaTeX as an intermediate representation.
     # WebPDFExporter uses HTML.
     return convert_nb(python_nb, nbconvert.WebPDFExporter)
 
 
-def convert_nb(python_nb: str, exporter_constructor):
-    notebook = nbformat.reads(python_nb, as_version=4)
+def convert_nb(python_nb: str | NotebookNode, exporter_constructor):
+    # Exporters copy the node, so one node can be rendered by several threads.
+    notebook = (
+        nbformat.reads(python_nb, as_version=4)
+        if isinstance(python_nb, str)
+        else python_nb
+    )
     exporter = exporter_constructor(
         template_name="lab",
         # The "classic" template's CSS forces large code cells on to
@@ -7,18 +7,445 @@ We'll use the following terms consistently throughout the application:
 """
 
 import re
+from functools import lru_cache
+from hashlib import sha256
+from mmap import mmap, ACCESS_READ
+from tempfile import mkstemp
+from threading import Lock
+from typing import Callable, NamedTuple, Optional
+from weakref import WeakValueDictionary
+import os
 import polars as pl
 from pathlib import Path
 
 
+# Headers longer than this are unusual enough that we just let Polars handle them.
+_max_header_bytes = 1024 * 1024
+
+# Large enough that per-block overhead is negligible,
+# and small enough that progress is reported often on multi-GB files.
+_row_count_block_bytes = 16 * 1024 * 1024
+
+# Previews are made from a sample of at most this many rows,
+# so they take about the same time, however large the file is.
+_max_sample_rows = 100_000
+
+# Quantiles in the profile are estimated from the sample.
+_profile_quantiles = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+# Columns with more distinct values than this are not offered for grouping.
+_max_group_cardinality = 100
+
+# Estimates of max_num_partitions are never lower than the generated code's default.
+_min_max_num_partitions = 100
+
+# Apart from CSV, Polars can scan Parquet and Arrow IPC (aka Feather) files.
+_format_by_extension = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+}
+data_extensions = list(_format_by_extension.keys())
+
+# Only one thread should convert a given CSV to Parquet at a time.
+# Locks are only held while they are in use, so the dict doesn't grow.
+_conversion_locks_lock = Lock()
+_conversion_locks: WeakValueDictionary[tuple[str, int, int], Lock] = (
+    WeakValueDictionary()
+)
+
+
+def get_data_format(path: Path) -> str:
+    """
+    Returns "csv", "parquet", or "ipc", based on the file extension.
+    Anything unrecognized is treated as CSV.
+
+    >>> get_data_format(Path("data.PARQUET"))
+    'parquet'
+    >>> get_data_format(Path("data.feather"))
+    'ipc'
+    >>> get_data_format(Path("data.txt"))
+    'csv'
+    """
+    return _format_by_extension.get(path.suffix.lower(), "csv")
+
+
+def scan_data(path: Path, infer_schema_length: Optional[int] = 100) -> pl.LazyFrame:
+    """
+    For CSVs, "infer_schema_length" is the number of rows read to infer
+    the types, or None to read the whole file.
+    """
+    data_format = get_data_format(path)
+    if data_format == "parquet":
+        return pl.scan_parquet(path)
+    if data_format == "ipc":
+        return pl.scan_ipc(path)
+    return pl.scan_csv(
+        path, encoding="utf8-lossy", infer_schema_length=infer_schema_length
+    )
+
+
+def _collect_with_fallback(
+    path: Path,
+    make_queries: Callable[[pl.LazyFrame], list[pl.LazyFrame]],
+    streaming: bool = False,
+) -> list[pl.DataFrame]:
+    """
+    Collects the queries made from a scan of the file.
+    CSV types are inferred from the first rows, so if a later value
+    doesn't parse, the queries are retried with the types inferred
+    from the whole file: Slower, but any file Polars can read will work.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix=".csv") as temp:
+    ...     lines = "".join(f"{i}\\n" for i in range(200))
+    ...     _ = Path(temp.name).write_text(f"a\\n{lines}oops\\n")
+    ...     (df,) = _collect_with_fallback(Path(temp.name), lambda lf: [lf])
+    >>> df["a"].dtype
+    String
+    """
+    try:
+        return pl.collect_all(make_queries(scan_data(path)), streaming=streaming)
+    except pl.exceptions.ComputeError:
+        if get_data_format(path) != "csv":
+            raise
+        return pl.collect_all(
+            make_queries(scan_data(path, infer_schema_length=None)),
+            streaming=streaming,
+        )
+
+
+class DataSample(NamedTuple):
+    df: pl.DataFrame
+    # Rows in the whole file, not just the sample:
+    row_count: int
+
+
+def get_data_sample(path: Path) -> DataSample:
+    """
+    Returns every n-th row of the file, so there are about _max_sample_rows.
+    Stride sampling is reproducible, and spreads the sample through the file.
+    The sample is cached in memory by file fingerprint,
+    so the file is only read once per upload.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix=".csv") as temp:
+    ...     lines = "".join(f"{i}\\n" for i in range(10))
+    ...     _ = Path(temp.name).write_text(f"a\\n{lines}")
+    ...     fingerprint = get_csv_fingerprint(Path(temp.name))
+    ...     sample = _get_data_sample_cached(*fingerprint, 4)
+    >>> sample.df["a"].to_list()
+    [0, 3, 6, 9]
+    >>> sample.row_count
+    10
+    """
+    return _get_data_sample_cached(*get_csv_fingerprint(path), _max_sample_rows)
+
+
+@lru_cache(maxsize=4)
+def _get_data_sample_cached(
+    path_str: str, size: int, mtime_ns: int, max_rows: int
+) -> DataSample:
+    # Size and mtime are only used as part of the cache key.
+    path = Path(path_str)
+    # The stride only needs an estimate of the row count:
+    # The exact count comes from the same pass that takes the sample.
+    estimated_rows = _estimate_row_count(path)
+    stride = max(-(-estimated_rows // max_rows), 1)
+    df, count_df = _collect_with_fallback(
+        path, lambda lf: [lf.gather_every(stride), lf.select(pl.len())]
+    )
+    return DataSample(df=df.rechunk(), row_count=count_df.item())
+
+
+def _estimate_row_count(path: Path) -> int:
+    """
+    For CSVs, extrapolates from the newlines in the first block,
+    rather than reading the whole file.
+    Other formats have an exact count in their metadata.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix=".csv") as temp:
+    ...     _ = Path(temp.name).write_text("a\\n" + "1\\n" * 999)
+    ...     _estimate_row_count(Path(temp.name))
+    1000
+    """
+    if get_data_format(path) != "csv":
+        return get_csv_row_count(path)
+    size = path.stat().st_size
+    with path.open("rb") as handle:
+        head = handle.read(_row_count_block_bytes)
+    if not head:
+        return 0
+    return round(size * head.count(b"\n") / len(head))
+
+
+class ColumnProfile(NamedTuple):
+    dtype: str
+    null_fraction: float
+    # Count of distinct values, including null:
+    cardinality: int
+    # Only for numeric columns:
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: Optional[dict[float, float]] = None
+
+    def is_group_eligible(self) -> bool:
+        return self.cardinality <= _max_group_cardinality
+
+    def get_quantile_pairs(self) -> tuple[tuple[float, float], ...]:
+        """
+        (probability, value) pairs, for make_candidates.
+
+        >>> profile = ColumnProfile("Int64", 0, 3, quantiles={0.5: 2, 0.25: 1})
+        >>> profile.get_quantile_pairs()
+        ((0.25, 1), (0.5, 2))
+        """
+        return tuple(sorted(self.quantiles.items())) if self.quantiles else ()
+
+    def get_default_bounds(self) -> Optional[tuple[float, float]]:
+        """
+        The range of a numeric column, widened if the column is constant,
+        since the lower bound should be less than the upper bound.
+
+        >>> ColumnProfile("Int64", 0, 3, min=1, max=5).get_default_bounds()
+        (1, 5)
+        >>> ColumnProfile("Int64", 0, 1, min=2, max=2).get_default_bounds()
+        (1, 3)
+        >>> ColumnProfile("String", 0, 3).get_default_bounds()
+        """
+        if self.min is None or self.max is None:
+            return None
+        if self.min < self.max:
+            return (self.min, self.max)
+        return (self.min - 1, self.max + 1)
+
+
+def get_data_profile(path: Path) -> dict[str, ColumnProfile]:
+    """
+    Describes every column in the file.
+    Dtypes, null fractions, min/max, and cardinality come from one
+    streaming pass over the whole file; Quantiles are estimated from
+    the sample, since exact quantiles would need every value in memory.
+    Profiles are cached by file fingerprint.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix=".csv") as temp:
+    ...     _ = Path(temp.name).write_text("a,b\\n1,x\\n2,y\\n,x\\n5,x\\n")
+    ...     profile = get_data_profile(Path(temp.name))
+    >>> profile["a"]
+    ColumnProfile(dtype='Int64', null_fraction=0.25, cardinality=4, min=1.0, ...)
+    >>> profile["b"]
+    ColumnProfile(dtype='String', null_fraction=0.0, cardinality=2, min=None, ...)
+    """
+    return _get_data_profile_cached(*get_csv_fingerprint(path))
+
+
+@lru_cache(maxsize=4)
+def _get_data_profile_cached(
+    path_str: str, size: int, mtime_ns: int
+) -> dict[str, ColumnProfile]:
+    # Size and mtime are only used as part of the cache key.
+    path = Path(path_str)
+    # The sample is read with the same types as the stats below.
+    sample_df = get_data_sample(path).df
+    schema = sample_df.schema
+    names = schema.names()
+    numeric = [i for i, dtype in enumerate(schema.dtypes()) if dtype.is_numeric()]
+    # Column names could be anything, so stats are aliased by column index.
+    (stats_df,) = _collect_with_fallback(
+        path,
+        lambda lf: [
+            lf.select(
+                pl.len().alias("len"),
+                *[
+                    pl.col(name).null_count().alias(f"nulls_{i}")
+                    for i, name in enumerate(names)
+                ],
+                *[
+                    # Exact, since an undercount could lead to too little noise
+                    # if the cardinality is used for max_num_partitions.
+                    pl.col(name).n_unique().alias(f"unique_{i}")
+                    for i, name in enumerate(names)
+                ],
+                *[
+                    pl.col(names[i]).min().cast(pl.Float64).alias(f"min_{i}")
+                    for i in numeric
+                ],
+                *[
+                    pl.col(names[i]).max().cast(pl.Float64).alias(f"max_{i}")
+                    for i in numeric
+                ],
+            )
+        ],
+        streaming=True,
+    )
+    stats = stats_df.row(0, named=True)
+    quantiles = (
+        sample_df.select(
+            pl.col(names[i]).cast(pl.Float64).quantile(q).alias(f"{i}_{q}")
+            for i in numeric
+            for q in _profile_quantiles
+        ).row(0, named=True)
+        if numeric
+        else {}
+    )
+
+    row_count = stats["len"]
+    return {
+        name: ColumnProfile(
+            dtype=str(schema[name]),
+            null_fraction=stats[f"nulls_{i}"] / row_count if row_count else 0.0,
+            cardinality=stats[f"unique_{i}"],
+            min=stats.get(f"min_{i}"),
+            max=stats.get(f"max_{i}"),
+            quantiles=(
+                {q: quantiles[f"{i}_{q}"] for q in _profile_quantiles}
+                if i in numeric
+                else None
+            ),
+        )
+        for i, name in enumerate(names)
+    }
+
+
+def estimate_max_num_partitions(
+    profile: dict[str, ColumnProfile], groups: list[str]
+) -> Optional[int]:
+    """
+    The product of the cardinalities of the grouping columns,
+    but not less than the default of the generated code,
+    or None if any of them is missing from the profile.
+
+    >>> profile = {
+    ...     "a": ColumnProfile("Int64", 0, 30),
+    ...     "b": ColumnProfile("String", 0, 40),
+    ... }
+    >>> estimate_max_num_partitions(profile, ["a", "b"])
+    1200
+    >>> estimate_max_num_partitions(profile, ["a"])
+    100
+    >>> estimate_max_num_partitions(profile, ["a", "c"])
+    """
+    max_num_partitions = 1
+    for group in groups:
+        if group not in profile:
+            return None
+        max_num_partitions *= profile[group].cardinality
+    return max(max_num_partitions, _min_max_num_partitions)
+
+
+def get_parquet_copy(csv_path: Path, cache_dir: Path) -> Path:
+    """
+    Returns the path of a Parquet copy of the CSV in cache_dir,
+    converting it the first time this version of the file is seen.
+    Parquet is columnar and typed, so repeated reads are much
+    cheaper than reparsing the CSV. Other formats are returned as-is.
+    """
+    if get_data_format(csv_path) != "csv":
+        return csv_path
+    fingerprint = get_csv_fingerprint(csv_path)
+    parquet_path = (
+        cache_dir / f"{sha256(repr(fingerprint).encode()).hexdigest()}.parquet"
+    )
+    with _conversion_locks_lock:
+        lock = _conversion_locks.get(fingerprint)
+        if lock is None:
+            lock = Lock()
+            _conversion_locks[fingerprint] = lock
+    with lock:
+        if not parquet_path.exists():
+            # Write to a temporary name, so a partial file is never visible.
+            handle, partial_name = mkstemp(dir=cache_dir, suffix=".partial")
+            os.close(handle)
+            try:
+                try:
+                    scan_data(csv_path).sink_parquet(partial_name)
+                except pl.exceptions.ComputeError:
+                    # As in _collect_with_fallback: A late value didn't parse.
+                    scan_data(csv_path, infer_schema_length=None).sink_parquet(
+                        partial_name
+                    )
+                Path(partial_name).replace(parquet_path)
+            finally:
+                Path(partial_name).unlink(missing_ok=True)
+    return parquet_path
+
+
 def read_csv_names(csv_path: Path):
-    # Polars is overkill, but it is more robust against
-    # variations in encoding than Python stdlib csv.
-    # However, it could be slow:
+    """
+    Returns the column names from the CSV header,
+    or from the schema of a Parquet or IPC file.
+    Results are cached by path, size, and modification time,
+    so repeated calls for an unchanged file do not touch the disk
+    beyond a stat().
+    """
+    names = _read_csv_names_cached(*get_csv_fingerprint(csv_path))
+    return list(names)
+
+
+def get_csv_fingerprint(csv_path: Path) -> tuple[str, int, int]:
+    """
+    Returns a tuple which will change if the file changes,
+    without reading the contents: Path, size, and modification time.
+    """
+    stat = csv_path.stat()
+    return (str(csv_path.absolute()), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=32)
+def _read_csv_names_cached(csv_path_str: str, size: int, mtime_ns: int):
+    # Size and mtime are only used as part of the cache key.
+    csv_path = Path(csv_path_str)
+    if get_data_format(csv_path) != "csv":
+        return tuple(scan_data(csv_path).collect_schema().names())
+    names = _read_header_names(csv_path)
+    if names is None:
+        names = _read_polars_names(csv_path)
+    return tuple(names)
+
+
+def _read_header_names(csv_path: Path) -> Optional[list[str]]:
+    """
+    Read just the first line of the CSV.
+    Returns None if the header has any features where
+    we want to defer to Polars, so the names are consistent
+    with what we get when the data is actually read.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile() as temp:
+    ...     _ = Path(temp.name).write_bytes(b"\\xef\\xbb\\xbfAndr\\xe9,b\\r\\n1,2")
+    ...     _read_header_names(Path(temp.name))
+    ['Andr�', 'b']
+    """
+    with csv_path.open("rb") as handle:
+        first_line = handle.readline(_max_header_bytes)
+    if not first_line.endswith(b"\n") and len(first_line) == _max_header_bytes:
+        return None
+    # Quoting rules are subtle, and there may be newlines inside quotes.
+    if b'"' in first_line:
+        return None
+    # "utf-8-sig" strips a BOM, if present, and "replace" corresponds
+    # to the "utf8-lossy" encoding we use with Polars elsewhere.
+    header = first_line.decode("utf-8-sig", errors="replace").rstrip("\r\n")
+    if not header:
+        return None
+    names = header.split(",")
+    # Polars renames duplicates.
+    if len(set(names)) != len(names):
+        return None
+    return names
+
+
+def _read_polars_names(csv_path: Path) -> list[str]:
+    # Polars is more robust against variations in encoding and quoting
+    # than Python stdlib csv. However, it could be slow:
     #
     # > Determining the column names of a LazyFrame requires
     # > resolving its schema, which is a potentially expensive operation.
-    lf = pl.scan_csv(csv_path)
+    lf = pl.scan_csv(csv_path, encoding="utf8-lossy")
     return lf.collect_schema().names()
 
 
@@ -30,9 +457,72 @@ def get_csv_names_mismatch(public_csv_path: Path, private_csv_path: Path):
     return (extra_public, extra_private)
 
 
-def get_csv_row_count(csv_path: Path):
-    lf = pl.scan_csv(csv_path)
-    return lf.select(pl.len()).collect().item()
+def get_csv_row_count(
+    csv_path: Path,
+    on_progress: Optional[Callable[[float], None]] = None,
+    quoted_newlines: bool = False,
+):
+    """
+    Count the data rows in the CSV, excluding the header,
+    by counting newlines in large blocks of a memory-mapped file.
+    If provided, "on_progress" is called after each block
+    with the fraction of the file read so far.
+    If "quoted_newlines" is set, newlines inside quoted fields are not counted,
+    but this is slower.
+    For Parquet and IPC files, the count comes from the file metadata.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile() as temp:
+    ...     _ = Path(temp.name).write_text('a,b\\n"x\\ny",2\\n3,4')
+    ...     get_csv_row_count(Path(temp.name))
+    ...     get_csv_row_count(Path(temp.name), quoted_newlines=True)
+    3
+    2
+    """
+    if get_data_format(csv_path) != "csv":
+        row_count = scan_data(csv_path).select(pl.len()).collect().item()
+        if on_progress is not None:
+            on_progress(1.0)
+        return row_count
+    size = csv_path.stat().st_size
+    if size == 0:
+        return 0
+    newline_count = 0
+    in_quotes = False
+    with csv_path.open("rb") as handle, mmap(
+        handle.fileno(), 0, access=ACCESS_READ
+    ) as mapped:
+        for start in range(0, size, _row_count_block_bytes):
+            block = mapped[start : start + _row_count_block_bytes]
+            if quoted_newlines:
+                block_count, in_quotes = _count_unquoted_newlines(block, in_quotes)
+                newline_count += block_count
+            else:
+                newline_count += block.count(b"\n")
+            if on_progress is not None:
+                on_progress(min(start + _row_count_block_bytes, size) / size)
+        ends_with_newline = mapped[size - 1 : size] == b"\n"
+    line_count = newline_count if ends_with_newline else newline_count + 1
+    # Don't count the header:
+    return max(line_count - 1, 0)
+
+
+def _count_unquoted_newlines(block: bytes, in_quotes: bool) -> tuple[int, bool]:
+    """
+    Returns the count of newlines outside of quotes,
+    and whether the block ends inside quotes.
+    An escaped quote ('""') toggles twice, so it needs no special handling.
+
+    >>> _count_unquoted_newlines(b'1\\n"2\\n""\\n"\\n"3', False)
+    (2, True)
+    """
+    newline_count = 0
+    for segment in block.split(b'"'):
+        if not in_quotes:
+            newline_count += segment.count(b"\n")
+        in_quotes = not in_quotes
+    # There is one more segment than quote, so undo the last toggle:
+    return newline_count, not in_quotes
 
 
 def id_labels_dict_from_names(names: list[str]):
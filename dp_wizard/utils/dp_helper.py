@@ -1,3 +1,8 @@
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Hashable, NamedTuple
+
 import polars as pl
 import opendp.prelude as dp
 
@@ -7,6 +12,52 @@ dp.enable_features("contrib")
 
 
 confidence = 0.95
+delta = 1e-7  # TODO
+
+
+class HistogramAccuracy(NamedTuple):
+    scale: float
+    accuracy: float
+
+
+def make_histogram_accuracy(
+    contributions: int,
+    weighted_epsilon: float,
+) -> HistogramAccuracy:
+    """
+    Returns the noise scale and the half-width of the confidence interval
+    for the counts in a histogram, without building a query or touching data.
+    Because the bin keys are public, one individual can change the counts
+    by at most "contributions" in total, however many bins there are,
+    and with Laplace noise, delta does not come into play.
+
+    >>> make_histogram_accuracy(contributions=1, weighted_epsilon=1)
+    HistogramAccuracy(scale=1.0, accuracy=3.37...)
+
+    This should match what OpenDP reports for the full query:
+    >>> from dp_wizard.utils.mock_data import mock_data, ColumnDef
+    >>> lf = pl.LazyFrame(mock_data({"value": ColumnDef(0, 10)}, row_count=100))
+    >>> for contributions, weighted_epsilon, bin_count in [(1, 1, 5), (10, 0.3, 20)]:
+    ...     analytic = make_histogram_accuracy(contributions, weighted_epsilon)
+    ...     from_query, _ = make_accuracy_histogram(
+    ...         lf=lf, column_name="value", row_count=100,
+    ...         lower_bound=0, upper_bound=10, bin_count=bin_count,
+    ...         contributions=contributions, weighted_epsilon=weighted_epsilon,
+    ...     )
+    ...     assert abs(analytic.accuracy - from_query) < 1e-9, (analytic, from_query)
+    """
+    scale = contributions / weighted_epsilon
+    accuracy = dp.discrete_laplacian_scale_to_accuracy(
+        scale=scale, alpha=1 - confidence
+    )
+    return HistogramAccuracy(scale=scale, accuracy=accuracy)
+
+
+class HistogramSpec(NamedTuple):
+    lower_bound: float
+    upper_bound: float
+    bin_count: int
+    weighted_epsilon: float
 
 
 def make_accuracy_histogram(
@@ -55,38 +106,237 @@ def make_accuracy_histogram(
     │ (8, 10] ┆ ... │
     └─────────┴─────┘
     """
+    return make_accuracy_histograms(
+        lf=lf,
+        histograms={
+            column_name: HistogramSpec(
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                bin_count=bin_count,
+                weighted_epsilon=weighted_epsilon,
+            )
+        },
+        row_count=row_count,
+        contributions=contributions,
+    )[column_name]
+
+
+@lru_cache(maxsize=128)
+def make_cut_labels(lower_bound: float, upper_bound: float, bin_count: int):
+    """
+    Returns the labels Polars cut() would give each bin, including the bins
+    which extend to -inf and +inf. They are in the same order as the indexes
+    from search_sorted(), so data can be binned by index,
+    and only the small results need to be labeled.
+    >>> make_cut_labels(0, 10, 2)
+    ('(-inf, 0]', '(0, 5]', '(5, 10]', '(10, inf]')
+    """
+    cut_points = make_cut_points(lower_bound, upper_bound, bin_count)
+    # One value in each bin: Cut points are the tops of their bins.
+    values = [cut_points[0] - 1, *cut_points[1:], cut_points[-1] + 1]
+    labels = pl.Series(values).cut([float(c) for c in cut_points]).cast(pl.String)
+    return tuple(labels.to_list())
+
+
+def make_accuracy_histograms(
+    lf: pl.LazyFrame,
+    histograms: dict[str, HistogramSpec],
+    row_count: int,
+    contributions: int,
+    count_scale: float = 1,
+) -> dict[str, tuple[float, pl.DataFrame]]:
+    """
+    Like make_accuracy_histogram, but for several columns at once:
+    The data is scanned and binned once, and there is one context,
+    which splits the privacy loss between the columns
+    in proportion to their weighted epsilons, as the generated code does.
+
+    >>> from dp_wizard.utils.mock_data import mock_data, ColumnDef
+    >>> lf = pl.LazyFrame(mock_data(
+    ...     {"a": ColumnDef(0, 10), "b": ColumnDef(0, 100)}, row_count=100
+    ... ))
+    >>> results = make_accuracy_histograms(
+    ...     lf=lf,
+    ...     histograms={
+    ...         "a": HistogramSpec(0, 10, bin_count=5, weighted_epsilon=1),
+    ...         "b": HistogramSpec(0, 100, bin_count=2, weighted_epsilon=0.5),
+    ...     },
+    ...     row_count=100,
+    ...     contributions=1,
+    ... )
+    >>> for name, (accuracy, histogram) in results.items():
+    ...     print(name, round(accuracy, 2), histogram.columns, histogram.height)
+    a 3.38 ['bin', 'len'] 5
+    b 6.43 ['bin', 'len'] 2
+
+    If the data is a sample, "count_scale" scales the exact counts up
+    to the whole population before the noise is added, so the noise,
+    and so the error, is the same as for the whole population:
+    >>> lf = pl.LazyFrame({"a": [1.0] * 100})
+    >>> spec = HistogramSpec(0, 10, bin_count=2, weighted_epsilon=1)
+    >>> accuracy, histogram = make_accuracy_histograms(
+    ...     lf=lf,
+    ...     histograms={"a": spec},
+    ...     row_count=100,
+    ...     contributions=1,
+    ...     count_scale=10,
+    ... )["a"]
+    >>> abs(histogram["len"].item() - 1000) <= accuracy * 2
+    True
+
+    Nulls are counted in their own bin, and not in the lowest bin:
+    >>> lf = pl.LazyFrame({"a": [None] * 50 + [1.0] * 50})
+    >>> _, histogram = make_accuracy_histograms(
+    ...     lf=lf,
+    ...     histograms={"a": HistogramSpec(0, 10, bin_count=2, weighted_epsilon=1)},
+    ...     row_count=100,
+    ...     contributions=1,
+    ... )["a"]
+    >>> histogram.sort("bin", nulls_last=True)["bin"].to_list()
+    ['(0, 5]', None]
+    """
     # TODO: https://github.com/opendp/dp-wizard/issues/219
     # When this is stable, merge it to templates, so we can be
     # sure that we're using the same code in the preview that we
     # use in the generated notebook.
-    cut_points = make_cut_points(lower_bound, upper_bound, bin_count)
+    bin_names = {name: f"bin_{i}" for i, name in enumerate(histograms)}
+    binned_df = lf.select(
+        # Bin by the index of the cut point, which is equivalent to cut(),
+        # but doesn't make a string for every row:
+        # Only the released counts are labeled.
+        # Like cut(), nulls are kept in their own bin.
+        pl.when(pl.col(name).is_null())
+        .then(None)
+        .otherwise(
+            pl.lit(
+                pl.Series(
+                    make_cut_points(spec.lower_bound, spec.upper_bound, spec.bin_count)
+                )
+            ).search_sorted(pl.col(name), side="left")
+        )
+        .alias(bin_names[name])
+        for name, spec in histograms.items()
+    ).collect()
     context = dp.Context.compositor(
-        data=lf.with_columns(
-            # The cut() method returns a Polars categorical type.
-            # Cast to string to get the human-readable label.
-            pl.col(column_name)
-            .cut(cut_points)
-            .alias("bin")
-            .cast(pl.String),
-        ),
+        data=binned_df.lazy(),
         privacy_unit=dp.unit_of(
             contributions=contributions,
         ),
         privacy_loss=dp.loss_of(
-            epsilon=weighted_epsilon,
-            delta=1e-7,  # TODO
+            epsilon=sum(spec.weighted_epsilon for spec in histograms.values()),
+            delta=delta,
         ),
-        split_by_weights=[1],
+        split_by_weights=[spec.weighted_epsilon for spec in histograms.values()],
         margins=[
             dp.polars.Margin(  # type: ignore
-                by=["bin"],
+                by=[bin_name],
                 max_partition_length=row_count,
                 public_info="keys",
-            ),
+            )
+            for bin_name in bin_names.values()
         ],
     )
-    query = context.query().group_by("bin").agg(pl.len().dp.noise())  # type: ignore
+    results = {}
+    for name, bin_name in bin_names.items():
+        query = (
+            context.query().group_by(bin_name).agg(pl.len().dp.noise())  # type: ignore
+        )
+        accuracy = query.summarize(alpha=1 - confidence)["accuracy"].item()  # type: ignore
+        spec = histograms[name]
+        labels = make_cut_labels(spec.lower_bound, spec.upper_bound, spec.bin_count)
+        released = query.release().collect()
+        if count_scale != 1:
+            # Only the exact counts are scaled, and the noise is kept as released.
+            exact = binned_df.group_by(bin_name).len("exact")
+            released = released.join(
+                exact, on=bin_name, how="left", join_nulls=True
+            ).select(
+                pl.col(bin_name),
+                (pl.col("exact") * count_scale + (pl.col("len") - pl.col("exact")))
+                .round()
+                .cast(pl.Int64)
+                .alias("len"),
+            )
+        histogram = released.select(
+            pl.col(bin_name)
+            .replace_strict(list(range(len(labels))), list(labels))
+            .alias("bin"),
+            pl.col("len"),
+        )
+        results[name] = (accuracy, histogram)
+    return results
+
+
+class AccuracyHistogramCache:
+    """
+    Memoizes make_accuracy_histograms, so flipping back and forth between
+    settings doesn't rerun OpenDP. The least recently used result
+    is evicted when there are more than max_size.
+    Since a cached release is reused rather than regenerated,
+    toggling settings also doesn't reveal fresh noise each time.
 
-    accuracy = query.summarize(alpha=1 - confidence)["accuracy"].item()  # type: ignore
-    histogram = query.release().collect()
-    return (accuracy, histogram)
+    The data itself isn't hashed: Callers provide a "data_fingerprint"
+    which should change whenever the data does,
+    and a function to make the LazyFrame, which is only called on a miss.
+
+    >>> from dp_wizard.utils.mock_data import mock_data, ColumnDef
+    >>> calls = []
+    >>> def make_lf():
+    ...     calls.append(1)
+    ...     return pl.LazyFrame(mock_data({"value": ColumnDef(0, 10)}, row_count=100))
+    >>> cache = AccuracyHistogramCache(max_size=1)
+    >>> spec = HistogramSpec(0, 10, bin_count=5, weighted_epsilon=1)
+    >>> kwargs = dict(row_count=100, contributions=1)
+    >>> first = cache.get("mock", make_lf, {"value": spec}, **kwargs)
+    >>> cache.get("mock", make_lf, {"value": spec}, **kwargs) is first
+    True
+    >>> len(calls)
+    1
+    >>> _ = cache.get("mock", make_lf, {"value": spec._replace(bin_count=2)}, **kwargs)
+    >>> cache.get("mock", make_lf, {"value": spec}, **kwargs) is first
+    False
+    >>> len(calls)
+    3
+    """
+
+    def __init__(self, max_size: int = 128):
+        self._max_size = max_size
+        # Results are computed outside the lock,
+        # but the cache may be used from worker threads.
+        self._lock = Lock()
+        self._results: OrderedDict[Hashable, dict[str, tuple[float, pl.DataFrame]]] = (
+            OrderedDict()
+        )
+
+    def get(
+        self,
+        data_fingerprint: Hashable,
+        make_lf: Callable[[], pl.LazyFrame],
+        histograms: dict[str, HistogramSpec],
+        row_count: int,
+        contributions: int,
+        count_scale: float = 1,
+    ) -> dict[str, tuple[float, pl.DataFrame]]:
+        key = (
+            data_fingerprint,
+            tuple(histograms.items()),
+            row_count,
+            contributions,
+            count_scale,
+        )
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        result = make_accuracy_histograms(
+            lf=make_lf(),
+            histograms=histograms,
+            row_count=row_count,
+            contributions=contributions,
+            count_scale=count_scale,
+        )
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self._max_size:
+                self._results.popitem(last=False)
+        return result
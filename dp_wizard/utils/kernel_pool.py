@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, Semaphore
+from typing import Optional
+import atexit
+import os
+
+from jupyter_client.manager import KernelManager
+
+
+# Importing these is a large part of the time to run a generated notebook,
+# so do it once when the kernel starts, rather than for every notebook.
+_warm_up_code = """
+import opendp.prelude
+import polars
+import matplotlib.pyplot
+"""
+
+# Close figures before reset, so the figure manager doesn't hold on to them.
+# A new session also restarts the execution count at 1.
+_reset_code = """
+import matplotlib.pyplot
+matplotlib.pyplot.close("all")
+get_ipython().reset(new_session=True)
+"""
+
+# Kernels start in the server's directory, and return to it after each use.
+_chdir_code = "import os\nos.chdir({path!r})\n"
+
+_timeout_seconds = 60
+
+
+class KernelPool:
+    """
+    Pool of Jupyter kernels which have already imported the libraries
+    that generated notebooks need. Kernels are started on demand,
+    up to max_size, and the namespace is reset after each use.
+    A kernel which can not be reset is shut down, and replaced on demand.
+    """
+
+    def __init__(self, max_size: int = 2, kernel_name: str = "python3"):
+        self.kernel_name = kernel_name
+        self._available = Semaphore(max_size)
+        self._lock = Lock()
+        self._idle: list[KernelManager] = []
+        self._all: list[KernelManager] = []
+
+    @contextmanager
+    def kernel(self, cwd: Optional[Path] = None):
+        """
+        Context manager which yields a KernelManager with a running kernel.
+        Blocks if all the kernels are in use.
+        If "cwd" is given, the kernel runs in that directory.
+        """
+        with self._available:
+            with self._lock:
+                km = self._idle.pop() if self._idle else None
+            if km is None or not km.is_alive():
+                if km is not None:
+                    self._shutdown(km)
+                km = self._start()
+            try:
+                if cwd is not None and not self._execute_silently(
+                    km, _chdir_code.format(path=str(cwd))
+                ):
+                    raise RuntimeError(f"Kernel could not change directory: {cwd}")
+                yield km
+            finally:
+                if self._reset(km):
+                    with self._lock:
+                        self._idle.append(km)
+                else:
+                    self._shutdown(km)
+
+    def shutdown(self):
+        with self._lock:
+            kms = list(self._all)
+            self._idle.clear()
+        for km in kms:
+            self._shutdown(km)
+
+    def _start(self) -> KernelManager:
+        km = KernelManager(kernel_name=self.kernel_name)
+        km.start_kernel()
+        with self._lock:
+            self._all.append(km)
+        if not self._execute_silently(km, _warm_up_code):
+            self._shutdown(km)
+            raise RuntimeError(f"Kernel warm-up failed: {_warm_up_code}")
+        return km
+
+    def _reset(self, km: KernelManager) -> bool:
+        return km.is_alive() and self._execute_silently(
+            km, _reset_code + _chdir_code.format(path=os.getcwd())
+        )
+
+    def _execute_silently(self, km: KernelManager, code: str) -> bool:
+        kc = km.blocking_client()
+        kc.start_channels()
+        try:
+            kc.wait_for_ready(timeout=_timeout_seconds)
+            reply = kc.execute_interactive(
+                code,
+                silent=True,
+                store_history=False,
+                timeout=_timeout_seconds,
+            )
+            return reply["content"]["status"] == "ok"
+        except (RuntimeError, TimeoutError):
+            return False
+        finally:
+            kc.stop_channels()
+
+    def _shutdown(self, km: KernelManager):
+        with self._lock:
+            if km in self._all:
+                self._all.remove(km)
+        try:
+            km.shutdown_kernel(now=True)
+        except RuntimeError:  # pragma: no cover
+            # Already dead.
+            pass
+
+
+kernel_pool = KernelPool()
+atexit.register(kernel_pool.shutdown)
@@ -1,4 +1,6 @@
+from functools import lru_cache
 from typing import NamedTuple
+import numpy as np
 import polars as pl
 from scipy.stats import norm
 
@@ -31,25 +33,56 @@ def mock_data(column_defs: dict[str, ColumnDef], row_count: int = 1000):
     100.0
     >>> df.get_column("col_neg_pos")[999]
     10.0
+
+    Values are calculated as arrays, so large row counts are practical:
+    >>> mock_data({"col_0_100": col_0_100}, row_count=1_000_000).height
+    1000000
+    """
+    return mock_lazy_frame(column_defs, row_count).collect()
+
+
+def mock_lazy_frame(column_defs: dict[str, ColumnDef], row_count: int = 1000):
     """
-    schema = {column_name: float for column_name in column_defs.keys()}
-    data = {column_name: [] for column_name in column_defs.keys()}
+    Like mock_data, but lazy: Each column is an affine transform
+    of a standardized normal column which is cached per row_count,
+    so many columns, sessions, and re-renders share one allocation.
 
-    quantile_width = 95 / 100
+    >>> lf = mock_lazy_frame({"col_0_100": ColumnDef(0, 100)}, row_count=10)
+    >>> lf.collect().get_column("col_0_100").round(2).to_list()
+    [20.03, 29.87, 37.35, 43.87, 50.0, 56.13, 62.65, 70.13, 79.97, 100.0]
+    """
+    standardized = pl.col(_standardized_name)
+    exprs = []
     for column_name, column_def in column_defs.items():
-        lower_ppf = norm.ppf((1 - quantile_width) / 2)
-        upper_ppf = norm.ppf(1 - (1 - quantile_width) / 2)
-        lower_bound = column_def.lower_bound
-        upper_bound = column_def.upper_bound
-        slope = (upper_bound - lower_bound) / (upper_ppf - lower_ppf)
-        intercept = lower_bound - slope * lower_ppf
-        # Start from 1 instead of 0:
-        # The polars bin intervals are closed at the top,
-        # so if we include the zero, there is one value in the
-        # (-inf, 0] bin.
-        for i in range(1, row_count + 1):
-            quantile = (quantile_width * i / (row_count)) + (1 - quantile_width) / 2
-            ppf = norm.ppf(quantile)
-            value = slope * ppf + intercept
-            data[column_name].append(value)
-    return pl.DataFrame(data=data, schema=schema)
+        slope, intercept = _affine_params(column_def)
+        exprs.append((pl.lit(slope) * standardized + intercept).alias(column_name))
+    return _standardized_lazy_frame(row_count).select(exprs)
+
+
+_quantile_width = 95 / 100
+_lower_ppf = float(norm.ppf((1 - _quantile_width) / 2))
+_upper_ppf = float(norm.ppf(1 - (1 - _quantile_width) / 2))
+_standardized_name = "standardized"
+
+
+def _affine_params(column_def: ColumnDef) -> tuple[float, float]:
+    """
+    Returns slope and intercept which map the central 95%
+    of the standard normal onto the bounds.
+    """
+    lower_bound = column_def.lower_bound
+    upper_bound = column_def.upper_bound
+    slope = (upper_bound - lower_bound) / (_upper_ppf - _lower_ppf)
+    intercept = lower_bound - slope * _lower_ppf
+    return slope, intercept
+
+
+@lru_cache(maxsize=8)
+def _standardized_lazy_frame(row_count: int) -> pl.LazyFrame:
+    # Start from 1 instead of 0:
+    # The polars bin intervals are closed at the top,
+    # so if we include the zero, there is one value in the
+    # (-inf, 0] bin.
+    i = np.arange(1, row_count + 1)
+    quantiles = (_quantile_width * i / (row_count)) + (1 - _quantile_width) / 2
+    return pl.LazyFrame({_standardized_name: norm.ppf(quantiles)})
@@ -1,8 +1,14 @@
 # These functions are used both in the application
 # and in generated notebooks.
+from functools import lru_cache
+from math import floor, log10
+
 from polars import DataFrame
+import numpy as np
+import polars as pl
 
 
+@lru_cache(maxsize=128)
 def make_cut_points(lower_bound: float, upper_bound: float, bin_count: int):
     """
     Returns one more cut point than the bin_count.
@@ -10,10 +16,132 @@ def make_cut_points(lower_bound: float, upper_bound: float, bin_count: int):
     -inf and +inf, but we'll ignore those.)
     Cut points are evenly spaced from lower_bound to upper_bound.
     >>> make_cut_points(0, 10, 2)
-    [0.0, 5.0, 10.0]
+    array([ 0.,  5., 10.])
+
+    Inner cut points are rounded, but keep enough digits to stay distinct,
+    and the bounds themselves are never rounded:
+    >>> make_cut_points(0, 10, 3)
+    array([ 0.  ,  3.33,  6.67, 10.  ])
+    >>> make_cut_points(0, 0.01, 4)
+    array([0.    , 0.0025, 0.005 , 0.0075, 0.01  ])
+    >>> make_cut_points(0, 10.001, 2)
+    array([ 0.   ,  5.   , 10.001])
+
+    Results are cached, so they are read-only:
+    >>> make_cut_points(0, 10, 2) is make_cut_points(0, 10, 2)
+    True
+    >>> make_cut_points(0, 10, 2)[0] = 1
+    Traceback (most recent call last):
+    ...
+    ValueError: assignment destination is read-only
+
+    >>> make_cut_points(10, 0, 2)
+    Traceback (most recent call last):
+    ...
+    ValueError: Lower bound (10) should be less than upper bound (0)
     """
+    if not lower_bound < upper_bound:
+        raise ValueError(
+            f"Lower bound ({lower_bound}) should be less than "
+            f"upper bound ({upper_bound})"
+        )
+    if bin_count < 1:
+        raise ValueError(f"Bin count ({bin_count}) should be at least 1")
     bin_width = (upper_bound - lower_bound) / bin_count
-    return [round(lower_bound + i * bin_width, 2) for i in range(bin_count + 1)]
+    # Two decimal places for readability, unless the bins are narrower:
+    # Rounding then moves a cut point by at most a twentieth of a bin.
+    decimals = max(2, 1 - floor(log10(bin_width)))
+    cut_points = np.linspace(lower_bound, upper_bound, bin_count + 1).round(decimals)
+    cut_points[0], cut_points[-1] = lower_bound, upper_bound
+    if not np.all(np.diff(cut_points) > 0):
+        raise ValueError(f"Cut points are not strictly increasing: {cut_points}")
+    cut_points.flags.writeable = False
+    return cut_points
+
+
+@lru_cache(maxsize=128)
+def make_candidates(
+    lower_bound: float,
+    upper_bound: float,
+    candidate_count: int,
+    spacing: str = "linear",
+    public_quantiles: tuple[tuple[float, float], ...] = (),
+):
+    """
+    Returns up to candidate_count candidates for private quantiles,
+    from lower_bound to upper_bound. The time to release a quantile
+    grows with the number of candidates, but with fewer, the released
+    value may be further from the true quantile.
+
+    "linear" candidates are evenly spaced, like cut points:
+    >>> make_candidates(0, 10, 3)
+    array([ 0.,  5., 10.])
+
+    "log" candidates are evenly spaced on a log scale, so they are
+    closer together near the lower bound. This suits skewed data,
+    like incomes, where most values are small but the range is wide:
+    >>> make_candidates(0, 999_999, 7, "log").tolist()
+    [0.0, 9.0, 99.0, 999.0, 9999.0, 99999.0, 999999.0]
+
+    "public" candidates follow (probability, value) pairs from public data:
+    Half are placed at evenly spaced public quantiles, so they are closer together
+    where the data is dense. The other half are evenly spaced, so the whole range
+    is still covered if the private data is different. Duplicates are dropped.
+    >>> make_candidates(0, 100, 10, "public", ((0.25, 1), (0.5, 2), (0.75, 4))).tolist()
+    [0.0, 1.0, 2.0, 4.0, 25.0, 50.0, 75.0, 100.0]
+
+    Both bounds and at least the public median are always included,
+    so with very few candidates there may be one more than candidate_count:
+    >>> make_candidates(0, 10, 2, "public", ((0.5, 3.0),)).tolist()
+    [0.0, 3.0, 10.0]
+    >>> make_candidates(0, 10, 3, "public", ((0.5, 3.0),)).tolist()
+    [0.0, 3.0, 10.0]
+
+    Results are cached, so they are read-only.
+    """
+    if candidate_count < 2:
+        raise ValueError(f"Candidate count ({candidate_count}) should be at least 2")
+    if spacing == "linear":
+        return make_cut_points(lower_bound, upper_bound, candidate_count - 1)
+    if not lower_bound < upper_bound:
+        raise ValueError(
+            f"Lower bound ({lower_bound}) should be less than "
+            f"upper bound ({upper_bound})"
+        )
+    if spacing == "log":
+        # Shift so the lower bound is at 1, since a log scale can't reach 0.
+        offset = 1 - lower_bound
+        candidates = np.geomspace(1, upper_bound + offset, candidate_count) - offset
+    elif spacing == "public":
+        # Public points include the bounds, and at least one between them.
+        public_count = max(3, candidate_count // 2)
+        probabilities, values = zip(
+            (0, lower_bound),
+            *sorted(public_quantiles),
+            (1, upper_bound),
+        )
+        candidates = np.concatenate(
+            [
+                np.interp(
+                    np.linspace(0, 1, public_count),
+                    probabilities,
+                    np.clip(values, lower_bound, upper_bound),
+                ),
+                np.linspace(
+                    lower_bound, upper_bound, max(2, candidate_count - public_count)
+                ),
+            ]
+        )
+    else:
+        raise ValueError(f"Unrecognized spacing: {spacing}")
+    # Two decimal places for readability, unless the range is narrow:
+    decimals = max(2, 3 - floor(log10(upper_bound - lower_bound)))
+    candidates = np.unique(candidates.round(decimals))
+    if len(candidates) < 2:
+        raise ValueError(f"Expected at least 2 candidates, not {candidates}")
+    candidates[0], candidates[-1] = lower_bound, upper_bound
+    candidates.flags.writeable = False
+    return candidates
 
 
 def interval_bottom(interval: str):
@@ -37,13 +165,31 @@ def df_to_columns(df: DataFrame):
     """
     Transform a Dataframe into a format that is easier to plot,
     parsing the interval strings to sort them as numbers.
+    The keys are joined, parsed, and sorted by Polars,
+    and only the final columns are converted to Python.
     """
-    merged_key_rows = [
-        (" ".join(str(k) for k in keys), value) for (*keys, value) in df.rows()
-    ]
-    sorted_rows = sorted(merged_key_rows, key=lambda row: interval_bottom(row[0]))
-    transposed = tuple(zip(*sorted_rows))
-    return transposed if transposed else (tuple(), tuple())
+    if df.is_empty():
+        return (tuple(), tuple())
+    *key_names, value_name = df.columns
+    sorted_df = df.select(
+        pl.concat_str(
+            [pl.col(name).cast(pl.String).fill_null("None") for name in key_names],
+            separator=" ",
+        ).alias("key"),
+        pl.col(value_name).alias("value"),
+        # Same as interval_bottom, but for the whole column at once.
+        pl.col(key_names[0])
+        .cast(pl.String)
+        .str.extract(r"^\(?\s*([^,]+)")
+        .str.strip_chars()
+        .cast(pl.Float64, strict=False)
+        .fill_null(0.0)
+        .alias("bottom"),
+    ).sort("bottom", maintain_order=True)
+    return (
+        tuple(sorted_df.get_column("key").to_list()),
+        tuple(sorted_df.get_column("value").to_list()),
+    )
 
 
 import matplotlib.pyplot as plt
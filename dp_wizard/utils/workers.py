@@ -0,0 +1,234 @@
+from asyncio import (
+    CancelledError,
+    Semaphore,
+    TimeoutError,
+    get_running_loop,
+    wait_for,
+    wrap_future,
+)
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from logging import warning
+from multiprocessing import get_context
+from threading import Lock
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
+import atexit
+
+
+T = TypeVar("T")
+
+
+class WorkerMetrics(NamedTuple):
+    waiting: int  # Waiting for one of the session's slots.
+    pending: int  # Submitted to a pool, and not yet finished.
+    completed: int
+    failed: int
+    timed_out: int
+
+
+class WorkerPool:
+    """
+    Runs slow work outside the event loop, so one busy session
+    doesn't hold up the others on the same process.
+    Polars and OpenDP release the GIL, so they run in threads;
+    Notebook conversion is mostly pure Python, so it runs in processes.
+    Processes are spawned on first use, since forking a threaded server is unsafe.
+
+    Executing notebooks can take much longer than anything else,
+    so it has its own threads, and doesn't hold up previews.
+
+    The pools are shared by all sessions, but each session gets
+    a limited number of slots, and previews which run past the timeout
+    are abandoned with a TimeoutError. Notebook execution and rendering
+    have separate slots, and by default no timeout, since a large
+    dataset can legitimately take a long time.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 4,
+        max_processes: int = 2,
+        max_artifact_threads: int = 2,
+        max_per_session: int = 2,
+        timeout_seconds: float = 300,
+        artifact_timeout_seconds: Optional[float] = None,
+    ):
+        self.max_per_session = max_per_session
+        self.timeout_seconds = timeout_seconds
+        self.artifact_timeout_seconds = artifact_timeout_seconds
+        self._max_processes = max_processes
+        self._threads = ThreadPoolExecutor(max_threads, thread_name_prefix="worker")
+        self._artifact_threads = ThreadPoolExecutor(
+            max_artifact_threads, thread_name_prefix="artifact"
+        )
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+        self._counts: Counter[str] = Counter()
+
+    @property
+    def metrics(self) -> WorkerMetrics:
+        with self._lock:
+            return WorkerMetrics(**{k: self._counts[k] for k in WorkerMetrics._fields})
+
+    def log_metrics(self):
+        warning(f"Workers: {self.metrics}")
+
+    def session(self) -> "SessionWorkers":
+        return SessionWorkers(self)
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future[T]:
+        """
+        Run in a thread, without a session limit or timeout.
+        """
+        return self._track(self._threads.submit(fn, *args, **kwargs))
+
+    def submit_artifact(
+        self, fn: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> Future[T]:
+        """
+        Run in a thread reserved for executing notebooks,
+        without a session limit or timeout.
+        """
+        return self._track(self._artifact_threads.submit(fn, *args, **kwargs))
+
+    def submit_to_process(
+        self, fn: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> Future[T]:
+        """
+        Run in a process, without a session limit or timeout.
+        The function and arguments must be picklable.
+        """
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    self._max_processes, mp_context=get_context("spawn")
+                )
+            processes = self._processes
+        return self._track(processes.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._artifact_threads.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            processes = self._processes
+            self._processes = None
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, key: str, change: int = 1):
+        with self._lock:
+            self._counts[key] += change
+
+    def _track(self, future: Future[T]) -> Future[T]:
+        self._count("pending")
+
+        def on_done(future: Future[T]):
+            self._count("pending", -1)
+            # Cancelled work, dropped before it started, also counts as failed.
+            if future.cancelled() or future.exception() is not None:
+                self._count("failed")
+            else:
+                self._count("completed")
+
+        future.add_done_callback(on_done)
+        return future
+
+
+class SessionWorkers:
+    """
+    One session's view of a WorkerPool: Awaitable versions of submit(),
+    submit_artifact(), and submit_to_process(), which wait for one of
+    the session's slots, and then for the result.
+    Previews and notebooks have separate slots, so downloads don't block previews.
+    If the awaiting task is cancelled, work which hasn't started is dropped.
+    Work which has started keeps its slot until it finishes,
+    even after a cancellation or timeout.
+    """
+
+    def __init__(self, pool: WorkerPool):
+        self._pool = pool
+        self._slots = Semaphore(pool.max_per_session)
+        self._artifact_slots = Semaphore(pool.max_per_session)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self._run(
+            self._pool.submit,
+            self._slots,
+            self._pool.timeout_seconds,
+            fn,
+            *args,
+            **kwargs,
+        )
+
+    async def run_artifact(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self._run(
+            self._pool.submit_artifact,
+            self._artifact_slots,
+            self._pool.artifact_timeout_seconds,
+            fn,
+            *args,
+            **kwargs,
+        )
+
+    async def run_in_process(
+        self, fn: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        # Only used for rendering notebooks.
+        return await self._run(
+            self._pool.submit_to_process,
+            self._artifact_slots,
+            self._pool.artifact_timeout_seconds,
+            fn,
+            *args,
+            **kwargs,
+        )
+
+    async def _run(
+        self,
+        submit: Callable[..., Future[T]],
+        slots: Semaphore,
+        timeout_seconds: Optional[float],
+        fn: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        pool = self._pool
+        loop = get_running_loop()
+        pool._count("waiting")
+        try:
+            await slots.acquire()
+        finally:
+            pool._count("waiting", -1)
+        try:
+            future = submit(fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+
+        # The slot is held until the work is finished, and not just until
+        # we stop waiting for it, so abandoned work still counts against
+        # the session, and can't pile up on the shared pool.
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # The loop is closed, so no one is waiting for a slot.
+
+        future.add_done_callback(release)
+        try:
+            return await wait_for(wrap_future(future), timeout_seconds)
+        except TimeoutError:
+            pool._count("timed_out")
+            warning(
+                f"{getattr(fn, '__name__', fn)} timed out "
+                f"after {timeout_seconds} seconds: {pool.metrics}"
+            )
+            raise
+        except CancelledError:
+            # Work which hasn't started is dropped.
+            future.cancel()
+            raise
+
+
+worker_pool = WorkerPool()
+atexit.register(worker_pool.shutdown)
@@ -40,7 +40,7 @@ def test_arg_validation_no_file():
 
 
 def test_arg_validation_not_csv():
-    with pytest.raises(ArgumentTypeError, match='Must have ".csv" extension:'):
+    with pytest.raises(ArgumentTypeError, match='Must have ".csv", ".parquet"'):
         _existing_csv_type(str(fixtures_path / "fake.ipynb"))
 
 
@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dp_wizard.utils import artifacts
+from dp_wizard.utils.artifacts import NotebookArtifactsCache
+from dp_wizard.utils.code_generators import AnalysisPlan, AnalysisPlanColumn
+from dp_wizard.utils.code_generators.analyses import histogram
+
+
+plan = AnalysisPlan(
+    csv_path="tests/fixtures/abc.csv",
+    contributions=1,
+    epsilon=1,
+    groups=[],
+    columns={
+        "B": AnalysisPlanColumn(
+            analysis_type=histogram.name,
+            lower_bound=5,
+            upper_bound=15,
+            bin_count=20,
+            weight=4,
+        )
+    },
+)
+
+
+def test_artifacts_from_one_execution(tmp_path):
+    bundle = NotebookArtifactsCache().get(plan, workspace=tmp_path)
+    # Reports were read into memory, and nothing is left behind:
+    assert list(tmp_path.iterdir()) == []
+    assert "outputs:" in bundle.report_txt
+    assert "inputs: epsilon,1" in bundle.report_csv
+    assert '"execution_count": 1' in bundle.notebook
+    assert "<html" in bundle.html
+
+
+def test_notebook_is_session_neutral(monkeypatch, tmp_path):
+    sources = []
+    convert = artifacts.convert_py_to_nb_node
+
+    def capturing_convert(notebook_py, **kwargs):
+        sources.append(notebook_py)
+        return convert(notebook_py, **kwargs)
+
+    monkeypatch.setattr(artifacts, "convert_py_to_nb_node", capturing_convert)
+    bundle = NotebookArtifactsCache().get(plan, workspace=tmp_path)
+    # The reports were written relative to the execution directory:
+    assert "outputs:" in bundle.report_txt
+    assert 'Path("report.txt")' in sources[0]
+    assert str(tmp_path) not in sources[0]
+
+
+def test_rendering_is_lazy(monkeypatch, tmp_path):
+    submitted = []
+    submit = artifacts.worker_pool.submit_to_process
+
+    def counting_submit(fn, *args):
+        submitted.append(fn.__name__)
+        return submit(fn, *args)
+
+    monkeypatch.setattr(artifacts.worker_pool, "submit_to_process", counting_submit)
+    bundle = NotebookArtifactsCache().get(plan, workspace=tmp_path)
+    assert submitted == []
+    assert bundle.html == bundle.html
+    assert submitted == ["convert_nb_to_html"]
+
+
+def test_concurrent_requests_share_execution(monkeypatch):
+    calls = []
+    make = artifacts.make_notebook_artifacts
+
+    def counting_make(analysis_plan, workspace):
+        calls.append(analysis_plan)
+        return make(analysis_plan, workspace)
+
+    monkeypatch.setattr(artifacts, "make_notebook_artifacts", counting_make)
+    cache = NotebookArtifactsCache()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        bundles = list(executor.map(cache.get, [plan] * 3))
+    assert len(calls) == 1
+    assert bundles[0] is bundles[1] is bundles[2]
+
+    cache.get(plan._replace(epsilon=2))
+    assert len(calls) == 2
+
+
+def test_failure_not_cached(monkeypatch):
+    def failing_make(analysis_plan, workspace):
+        raise ValueError("failed")
+
+    monkeypatch.setattr(artifacts, "make_notebook_artifacts", failing_make)
+    cache = NotebookArtifactsCache()
+    for _ in range(2):
+        with pytest.raises(ValueError, match=r"failed"):
+            cache.get(plan)
+    assert len(cache._futures) == 0
@@ -2,14 +2,23 @@ from tempfile import NamedTemporaryFile
 import subprocess
 import pytest
 import re
+import black
 import opendp.prelude as dp
+import polars as pl
 
-from dp_wizard.utils.code_generators.analyses import histogram, mean, median
+from dp_wizard.utils.code_generators.analyses import (
+    histogram,
+    mean,
+    median,
+    quantile,
+    stdeviation,
+)
 from dp_wizard.utils.code_generators import (
     make_column_config_block,
     AnalysisPlan,
     AnalysisPlanColumn,
 )
+from dp_wizard.utils.code_generators import abstract_generator
 from dp_wizard.utils.code_generators.notebook_generator import NotebookGenerator
 from dp_wizard.utils.code_generators.script_generator import ScriptGenerator
 
@@ -47,6 +56,19 @@ hw_grade_expr = (
     )
 
 
+def test_make_column_config_block_for_stdeviation():
+    block = make_column_config_block(
+        name="HW GRADE",
+        analysis_type=stdeviation.name,
+        lower_bound=-10,
+        upper_bound=5,
+        bin_count=10,
+    )
+    assert ".alias('hw_grade_squared')" in block
+    assert ".dp.sum((0, 100))" in block
+    assert "hw_grade_expr = [" in block
+
+
 def test_make_column_config_block_for_median():
     assert (
         make_column_config_block(
@@ -59,19 +81,43 @@ def test_make_column_config_block_for_median():
         == """# See the OpenDP docs for more on making private medians and quantiles:
 # https://docs.opendp.org/en/stable/getting-started/tabular-data/essential-statistics.html#Median
 
+# More candidates give finer results, but take longer to release.
+hw_grade_candidates = make_candidates(
+    lower_bound=0,
+    upper_bound=100,
+    candidate_count=101,
+    spacing='linear',
+    public_quantiles=(),
+)
 hw_grade_expr = (
     pl.col('HW GRADE')
     .cast(float)
     .fill_nan(0)
     .fill_null(0)
-    .dp.quantile(0.5, make_cut_points(0, 100, bin_count=100))
-    # todo: Get the bin count from the user?
-    # or get nice round numbers?
-    # See: https://github.com/opendp/opendp/issues/1706
+    .dp.quantile(0.5, hw_grade_candidates)
 )"""
     )
 
 
+def test_make_column_config_block_for_quantile():
+    block = make_column_config_block(
+        name="HW GRADE",
+        analysis_type=quantile.name,
+        lower_bound=0,
+        upper_bound=100,
+        bin_count=10,
+        alphas=(0.25, 0.9),
+        candidate_count=51,
+        candidate_spacing="public",
+        public_quantiles=((0.5, 70.0),),
+    )
+    assert "hw_grade_candidates = make_candidates(" in block
+    assert "candidate_count=51," in block
+    assert "public_quantiles=((0.5, 70.0),)," in block
+    assert ".dp.quantile(alpha, hw_grade_candidates)" in block
+    assert "for alpha in [0.25, 0.9]" in block
+
+
 def test_make_column_config_block_for_histogram():
     assert (
         make_column_config_block(
@@ -131,6 +177,25 @@ median_plan_column = AnalysisPlanColumn(
     upper_bound=15,
     bin_count=0,  # Unused
     weight=4,
+    candidate_spacing="log",
+)
+quantile_plan_column = AnalysisPlanColumn(
+    analysis_type=quantile.name,
+    lower_bound=5,
+    upper_bound=15,
+    bin_count=0,  # Unused
+    weight=4,
+    alphas=(0.1, 0.5, 0.9),
+    candidate_count=21,
+    candidate_spacing="public",
+    public_quantiles=((0.25, 7.0), (0.5, 8.0), (0.75, 12.0)),
+)
+stdeviation_plan_column = AnalysisPlanColumn(
+    analysis_type=stdeviation.name,
+    lower_bound=5,
+    upper_bound=15,
+    bin_count=0,  # Unused
+    weight=4,
 )
 
 
@@ -155,11 +220,15 @@ plans = [
         {"B": histogram_plan_column},
         {"B": mean_plan_column},
         {"B": median_plan_column},
+        {"B": stdeviation_plan_column},
+        {"B": quantile_plan_column},
         # Multiple:
         {
             "B": histogram_plan_column,
             "C": mean_plan_column,
             "D": median_plan_column,
+            "E": stdeviation_plan_column,
+            "F": quantile_plan_column,
         },
     ]
 ]
@@ -191,3 +260,101 @@ def test_make_script(plan):
             ["python", fp.name, "--csv", abc_csv], capture_output=True
         )
         assert result.returncode == 0
+
+
+@pytest.mark.parametrize("groups", [[], ["A"]])
+def test_make_notebook_with_histogram_last(groups, tmp_path):
+    plan = AnalysisPlan(
+        groups=groups,
+        columns={"B": quantile_plan_column, "C": histogram_plan_column},
+        contributions=1,
+        csv_path=abc_csv,
+        epsilon=1,
+    )
+    notebook = NotebookGenerator(plan, report_dir=tmp_path).make_py()
+    exec(notebook, {})
+    report = (tmp_path / "report.txt").read_text()
+    assert "quantiles:" in report
+    assert "histogram:" in report
+
+
+def test_single_pass_only_for_multiple_queries():
+    single_plan, multiple_plan = plans[0], plans[5]
+    materialize = ".collect().lazy()"
+    assert materialize not in ScriptGenerator(single_plan).make_py()
+    assert materialize in ScriptGenerator(multiple_plan).make_py()
+    assert (
+        materialize not in ScriptGenerator(multiple_plan, single_pass=False).make_py()
+    )
+
+
+def test_schema_inference_only_for_groups():
+    ungrouped_plan, grouped_plan = plans[5], plans[11]
+    assert grouped_plan.groups == ["A"]
+    assert "infer_schema=False" in ScriptGenerator(ungrouped_plan).make_py()
+    grouped_script = ScriptGenerator(grouped_plan).make_py()
+    assert "infer_schema=True" in grouped_script
+    assert '.select(["B", "C", "D", "E", "F", "A"])' in grouped_script
+
+
+def test_make_script_for_parquet(tmp_path):
+    parquet_path = tmp_path / "abc.parquet"
+    pl.read_csv(abc_csv).write_parquet(parquet_path)
+    plan = plans[5]._replace(csv_path=str(parquet_path))
+    script = ScriptGenerator(plan).make_py()
+    assert "pl.scan_parquet(csv_path)" in script
+    assert "pl.scan_csv" not in script
+    assert "Path to Parquet file containing private data" in script
+    assert "utf8-lossy" not in NotebookGenerator(plan).make_py()
+    assert "utf8-lossy" in NotebookGenerator(plans[5]).make_py()
+
+    with NamedTemporaryFile(mode="w") as fp:
+        fp.write(script)
+        fp.flush()
+
+        result = subprocess.run(
+            ["python", fp.name, "--csv", str(parquet_path)], capture_output=True
+        )
+        assert result.returncode == 0, result.stderr
+
+
+def test_max_num_partitions_from_plan():
+    plan = plans[11]
+    assert "max_num_partitions=100," in ScriptGenerator(plan).make_py()
+    plan = plan._replace(max_num_partitions=3)
+    assert "max_num_partitions=3," in ScriptGenerator(plan).make_py()
+
+
+@pytest.mark.parametrize("generator", [NotebookGenerator, ScriptGenerator])
+@pytest.mark.parametrize("plan", [plans[0], plans[11]], ids=id_for_plan)
+def test_generated_code_is_formatted(generator, plan):
+    # Fragments are formatted separately, but the result should be the same
+    # as formatting the whole file.
+    code = generator(plan).make_py()
+    assert black.format_str(code, mode=black.Mode(line_length=74)) == code
+
+
+def test_unchanged_columns_are_reused(monkeypatch):
+    made = []
+
+    def make_block(**kwargs):
+        made.append(kwargs["name"])
+        return make_column_config_block(**kwargs)
+
+    monkeypatch.setattr(
+        abstract_generator, "fragment_cache", abstract_generator.FragmentCache()
+    )
+    monkeypatch.setattr(abstract_generator, "make_column_config_block", make_block)
+    plan = plans[11]
+    script = ScriptGenerator(plan).make_py()
+    assert made == ["B", "C", "D", "E", "F"]
+
+    made.clear()
+    assert ScriptGenerator(plan).make_py() == script
+    assert made == []
+
+    changed_plan = plan._replace(
+        columns={**plan.columns, "C": mean_plan_column._replace(upper_bound=20)}
+    )
+    assert ScriptGenerator(changed_plan).make_py() != script
+    assert made == ["C"]
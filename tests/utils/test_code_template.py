@@ -148,3 +148,25 @@ def test_fill_blocks_not_string():
         match=r"For SOMETHING in string template, expected string, not 123",
     ):
         template.fill_blocks(SOMETHING=123).finish()
+
+
+def test_templates_compiled_once():
+    from dp_wizard.utils import code_generators
+
+    first = Template("imports", code_generators.__file__)
+    second = Template("imports", code_generators.__file__)
+    assert first._compiled is second._compiled
+    # But each Template is filled independently:
+    assert first.finish() == second.finish()
+
+
+def test_filled_text_is_not_filled_again():
+    template = Template("FIRST SECOND")
+    filled = template.fill_expressions(FIRST="SECOND", SECOND="2").finish()
+    assert filled == "SECOND 2"
+
+
+def test_fill_same_slot_twice():
+    template = Template("VERB VERB").fill_expressions(VERB="expects")
+    with pytest.raises(Exception, match=r"No 'VERB' slot to fill with 'sings'"):
+        template.fill_expressions(VERB="sings")
@@ -2,6 +2,7 @@ import re
 from pathlib import Path
 import pytest
 import json
+import nbformat
 from dp_wizard.utils.converters import (
     convert_py_to_nb,
     _clean_nb,
@@ -53,7 +54,7 @@ def test_convert_py_to_nb_execute():
 def test_clean_nb():
     # Trivial test just to get 100% branch coverage.
     nb = {"cells": []}
-    assert nb == json.loads(_clean_nb(json.dumps(nb)))
+    assert nb == _clean_nb(nbformat.from_dict(nb))
 
 
 def test_convert_py_to_nb_error():
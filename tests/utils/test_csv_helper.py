@@ -6,9 +6,15 @@ import pytest
 
 from pathlib import Path
 
+from dp_wizard.utils import csv_helper
 from dp_wizard.utils.csv_helper import (
     get_csv_names_mismatch,
     get_csv_row_count,
+    get_data_profile,
+    get_data_sample,
+    get_parquet_copy,
+    read_csv_names,
+    scan_data,
 )
 
 
@@ -23,6 +29,34 @@ def test_get_csv_names_mismatch():
         assert just_b == {"d"}
 
 
+@pytest.mark.parametrize(
+    "header",
+    [
+        "a,b,c",
+        "a,,c",
+        "a,b,a",
+        '"a,b",c',
+        '"q""z",c',
+        "\ufeffa,b,c",
+    ],
+)
+def test_read_csv_names_matches_polars(header):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "a.csv"
+        path.write_text(f"{header}\n1,2,3")
+        expected = pl.scan_csv(path).collect_schema().names()
+        assert read_csv_names(path) == expected
+
+
+def test_read_csv_names_cache_invalidated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "a.csv"
+        path.write_text("a,b,c")
+        assert read_csv_names(path) == ["a", "b", "c"]
+        path.write_text("a,b,c,d")
+        assert read_csv_names(path) == ["a", "b", "c", "d"]
+
+
 def test_get_csv_row_count():
     with tempfile.TemporaryDirectory() as tmp:
         path = Path(tmp) / "a.csv"
@@ -30,6 +64,125 @@ def test_get_csv_row_count():
         assert get_csv_row_count(path) == 1
 
 
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_columnar_formats(tmp_path, extension):
+    df = pl.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    path = tmp_path / f"data{extension}"
+    if extension == ".parquet":
+        df.write_parquet(path)
+    else:
+        df.write_ipc(path)
+    assert read_csv_names(path) == ["a", "b"]
+    progress = []
+    assert get_csv_row_count(path, on_progress=progress.append) == 3
+    assert progress == [1.0]
+    pl_testing.assert_frame_equal(scan_data(path).collect(), df)
+
+
+def test_get_parquet_copy(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("a,b\n1,2\n3,4\n")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+
+    parquet_path = get_parquet_copy(csv_path, cache_dir)
+    assert parquet_path.suffix == ".parquet"
+    pl_testing.assert_frame_equal(pl.read_parquet(parquet_path), pl.read_csv(csv_path))
+    assert get_parquet_copy(csv_path, cache_dir) == parquet_path
+    assert list(cache_dir.iterdir()) == [parquet_path]
+    # Locks are dropped once the conversion is done:
+    assert len(csv_helper._conversion_locks) == 0
+
+    # A changed file gets a new copy:
+    csv_path.write_text("a,b\n1,2\n3,4\n5,6\n")
+    new_parquet_path = get_parquet_copy(csv_path, cache_dir)
+    assert new_parquet_path != parquet_path
+    assert pl.read_parquet(new_parquet_path).height == 3
+
+    # Other formats are not copied:
+    assert get_parquet_copy(parquet_path, cache_dir) == parquet_path
+
+
+def test_get_data_sample(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_helper, "_max_sample_rows", 30)
+    path = tmp_path / "data.parquet"
+    pl.DataFrame({"a": range(100)}).write_parquet(path)
+
+    sample = get_data_sample(path)
+    assert sample.row_count == 100
+    assert sample.df["a"].to_list() == list(range(0, 100, 4))
+    # Cached, rather than read again:
+    assert get_data_sample(path) is sample
+
+
+def test_get_data_sample_estimates_csv_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_helper, "_max_sample_rows", 30)
+    monkeypatch.setattr(csv_helper, "_row_count_block_bytes", 40)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Should not count every row")
+
+    monkeypatch.setattr(csv_helper, "get_csv_row_count", fail)
+    path = tmp_path / "data.csv"
+    path.write_text("a\n" + "".join(f"{i}\n" for i in range(100, 200)))
+
+    sample = get_data_sample(path)
+    assert sample.row_count == 100
+    assert 20 <= sample.df.height <= 40
+
+
+def test_get_data_profile(tmp_path):
+    path = tmp_path / "data.parquet"
+    pl.DataFrame(
+        {
+            "value": [float(i) for i in range(1000)],
+            "category": [str(i % 3) for i in range(1000)],
+            "id": [str(i) for i in range(1000)],
+        }
+    ).write_parquet(path)
+
+    profile = get_data_profile(path)
+    value = profile["value"]
+    assert value.dtype == "Float64"
+    assert (value.min, value.max) == (0, 999)
+    assert value.quantiles is not None
+    assert abs(value.quantiles[0.5] - 500) < 1
+    assert profile["category"].quantiles is None
+    assert profile["category"].is_group_eligible()
+    assert not profile["id"].is_group_eligible()
+    # Exact, rather than approximate:
+    assert profile["id"].cardinality == 1000
+
+
+def test_type_changes_late_in_csv(tmp_path):
+    # Types are inferred from the first rows, so "oops" doesn't parse
+    # unless the whole file is read to infer them.
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n" + "".join(f"{i},{i}\n" for i in range(2000)) + "oops,1\n")
+
+    profile = get_data_profile(path)
+    assert profile["a"].dtype == "String"
+    assert profile["a"].cardinality == 2001
+    assert profile["b"].dtype == "Int64"
+    assert (profile["b"].min, profile["b"].max) == (0, 1999)
+    assert get_data_sample(path).row_count == 2001
+
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    assert pl.read_parquet(get_parquet_copy(path, cache_dir)).height == 2001
+
+
+def test_get_csv_row_count_progress(monkeypatch):
+    monkeypatch.setattr(csv_helper, "_row_count_block_bytes", 4)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "a.csv"
+        path.write_text('a,b\n"x\ny",2\n3,4\n')
+        progress = []
+        assert get_csv_row_count(path, on_progress=progress.append) == 3
+        assert progress == [0.25, 0.5, 0.75, 1.0]
+        assert get_csv_row_count(path, quoted_newlines=True) == 2
+
+
 # We will not reference the encoding when reading:
 # We need to be robust against any input.
 #
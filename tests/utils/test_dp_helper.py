@@ -0,0 +1,23 @@
+from dp_wizard.utils.dp_helper import make_cut_labels
+from dp_wizard.utils.shared import make_cut_points
+import polars as pl
+import pytest
+
+
+@pytest.mark.parametrize(
+    "lower_bound,upper_bound,bin_count", [(0, 10, 5), (0, 0.01, 10), (-1, 1e6, 7)]
+)
+def test_cut_labels_match_cut(lower_bound, upper_bound, bin_count):
+    cut_points = make_cut_points(lower_bound, upper_bound, bin_count)
+    labels = make_cut_labels(lower_bound, upper_bound, bin_count)
+    values = pl.Series(
+        [lower_bound - 1, lower_bound, *(cut_points[1:] - 1e-9), upper_bound + 1],
+        dtype=pl.Float64,
+    )
+    by_cut = values.cut(list(cut_points)).cast(pl.String).to_list()
+    by_index = [
+        labels[i]
+        for i in pl.Series(cut_points).search_sorted(values, side="left").to_list()
+    ]
+    assert by_cut == by_index
+    assert len(set(by_cut)) == bin_count + 2
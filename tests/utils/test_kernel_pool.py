@@ -0,0 +1,54 @@
+import os
+
+from dp_wizard.utils.kernel_pool import KernelPool
+
+
+def execute(km, code):
+    kc = km.blocking_client()
+    kc.start_channels()
+    try:
+        outputs = []
+        kc.execute_interactive(
+            code,
+            output_hook=lambda msg: outputs.append(msg["content"].get("text", "")),
+        )
+        return "".join(outputs)
+    finally:
+        kc.stop_channels()
+
+
+def test_kernel_reused_and_reset():
+    pool = KernelPool(max_size=1)
+    try:
+        with pool.kernel() as first_km:
+            assert execute(first_km, "x = 1; print(x)") == "1\n"
+        with pool.kernel() as second_km:
+            assert second_km is first_km
+            assert execute(second_km, "print('x' in globals())") == "False\n"
+    finally:
+        pool.shutdown()
+
+
+def test_dead_kernel_replaced():
+    pool = KernelPool(max_size=1)
+    try:
+        with pool.kernel() as first_km:
+            first_km.shutdown_kernel(now=True)
+        with pool.kernel() as second_km:
+            assert second_km is not first_km
+            assert execute(second_km, "print('ok')") == "ok\n"
+    finally:
+        pool.shutdown()
+
+
+def test_kernel_cwd(tmp_path):
+    pool = KernelPool(max_size=1)
+    try:
+        with pool.kernel(cwd=tmp_path) as km:
+            execute(km, "open('report.txt', 'w').write('ok')")
+        assert (tmp_path / "report.txt").read_text() == "ok"
+        with pool.kernel() as km:
+            # Back in the server's directory:
+            assert execute(km, "import os; print(os.getcwd())") == f"{os.getcwd()}\n"
+    finally:
+        pool.shutdown()
@@ -1,5 +1,6 @@
-from dp_wizard.utils.shared import df_to_columns
+from dp_wizard.utils.shared import df_to_columns, make_candidates
 import polars as pl
+import pytest
 
 
 def test_two_column_df_to_columns():
@@ -55,3 +56,53 @@ def test_no_rows_df_to_columns():
         tuple(),
         tuple(),
     )
+
+
+def test_unparsed_and_null_keys_df_to_columns():
+    df = pl.DataFrame(
+        {
+            "bin": ["(10, 20]", "unexpected", "(-10, 0]"],
+            "str": ["A", None, "B"],
+            "len": [1, 2, 3],
+        }
+    )
+    # Keys which can't be parsed sort as zero, and the sort is stable.
+    assert df_to_columns(df) == (
+        ("(-10, 0] B", "unexpected None", "(10, 20] A"),
+        (3, 2, 1),
+    )
+
+
+public_quantiles = ((0.01, 2.0), (0.5, 20.0), (0.99, 5e6))
+
+
+@pytest.mark.parametrize("spacing", ["linear", "log", "public"])
+@pytest.mark.parametrize(
+    "lower_bound,upper_bound", [(0, 1e7), (-5, 5), (1000, 1000.5), (0, 1)]
+)
+def test_candidates(spacing, lower_bound, upper_bound):
+    candidates = make_candidates(
+        lower_bound, upper_bound, 101, spacing, public_quantiles
+    )
+    assert candidates[0] == lower_bound
+    assert candidates[-1] == upper_bound
+    assert (candidates[1:] > candidates[:-1]).all()
+    # Only the public spacing can have duplicates to drop:
+    assert len(candidates) == 101 or spacing == "public"
+    assert len(candidates) > 50
+
+
+def test_log_candidates_are_dense_at_lower_bound():
+    linear = make_candidates(0, 1e7, 101, "linear")
+    log = make_candidates(0, 1e7, 101, "log")
+    assert (log < 1e5).sum() > 50
+    assert (linear < 1e5).sum() == 1
+
+
+def test_bad_candidates():
+    with pytest.raises(ValueError, match=r"at least 2"):
+        make_candidates(0, 10, 1)
+    with pytest.raises(ValueError, match=r"should be less than"):
+        make_candidates(10, 0, 11, "log")
+    with pytest.raises(ValueError, match=r"Unrecognized spacing"):
+        make_candidates(0, 10, 11, "cubic")
@@ -0,0 +1,145 @@
+import asyncio
+from operator import add
+from threading import Lock
+import time
+
+import pytest
+
+from dp_wizard.utils.workers import WorkerMetrics, WorkerPool
+
+
+def test_session_limit():
+    pool = WorkerPool(max_threads=4, max_per_session=2)
+    lock = Lock()
+    running = []
+    max_running = []
+
+    def work():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.pop()
+
+    async def main():
+        workers = pool.session()
+        other_workers = pool.session()
+        await asyncio.gather(
+            *[workers.run(work) for _ in range(4)],
+            *[other_workers.run(work) for _ in range(4)],
+        )
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    # Two slots in each of two sessions:
+    assert max(max_running) == 4
+    assert pool.metrics == WorkerMetrics(
+        waiting=0, pending=0, completed=8, failed=0, timed_out=0
+    )
+
+
+def test_timeout():
+    pool = WorkerPool(timeout_seconds=0.1)
+
+    async def main():
+        workers = pool.session()
+        with pytest.raises(asyncio.TimeoutError):
+            await workers.run(time.sleep, 1)
+        # The other slot is free, so the session can go on.
+        assert await workers.run(add, 1, 2) == 3
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert pool.metrics.timed_out == 1
+
+
+def test_timed_out_work_holds_slot():
+    pool = WorkerPool(max_threads=2, max_per_session=1, timeout_seconds=0.1)
+
+    async def main():
+        workers = pool.session()
+        with pytest.raises(asyncio.TimeoutError):
+            await workers.run(time.sleep, 0.5)
+        start = time.monotonic()
+        assert await workers.run(add, 1, 2) == 3
+        # The next run waited for the abandoned work to finish.
+        return time.monotonic() - start
+
+    try:
+        assert asyncio.run(main()) > 0.2
+    finally:
+        pool.shutdown()
+    assert pool.metrics == WorkerMetrics(
+        waiting=0, pending=0, completed=2, failed=0, timed_out=1
+    )
+
+
+def test_cancel_drops_queued_work():
+    pool = WorkerPool(max_threads=1, max_per_session=2)
+    ran = []
+
+    async def main():
+        workers = pool.session()
+        running = asyncio.ensure_future(workers.run(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        # Only one thread, so this waits in the pool's queue:
+        queued = asyncio.ensure_future(workers.run(ran.append, 1))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await running
+        # Both slots are free again.
+        assert await asyncio.gather(workers.run(add, 1, 2), workers.run(add, 3, 4)) == [
+            3,
+            7,
+        ]
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert ran == []
+    assert pool.metrics == WorkerMetrics(
+        waiting=0, pending=0, completed=3, failed=1, timed_out=0
+    )
+
+
+def test_artifacts_have_own_slots_and_no_timeout():
+    pool = WorkerPool(max_threads=1, max_per_session=1, timeout_seconds=0.1)
+
+    async def main():
+        workers = pool.session()
+        artifact = asyncio.ensure_future(workers.run_artifact(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        # Previews aren't held up by the artifact:
+        start = time.monotonic()
+        assert await workers.run(add, 1, 2) == 3
+        assert time.monotonic() - start < 0.2
+        # And the artifact isn't cut off by the preview timeout:
+        await artifact
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert pool.metrics == WorkerMetrics(
+        waiting=0, pending=0, completed=2, failed=0, timed_out=0
+    )
+
+
+def test_run_in_process():
+    pool = WorkerPool(max_processes=1)
+
+    async def main():
+        return await pool.session().run_in_process(add, 1, 2)
+
+    try:
+        assert asyncio.run(main()) == 3
+    finally:
+        pool.shutdown()